@@ -1,20 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..core.db import get_db, Base, engine
+from ..core.cache import response_cache
+from ..core.db import get_async_db, get_db
 from ..models.product import Product
 from ..models.price_history import PriceHistory
+from ..models.price_rollup import PriceDaily, PriceHourly
 from ..models.watch import Watch
-from .schemas import TrackRequest, ProductOut, PricePoint
+from .schemas import BulkScrapeRequest, TrackRequest, ProductOut, Resolution
+from ..scraper.bulk import scrape_many
+from ..scraper.queue import scrape_queue
 from ..scraper.runner import scrape_once
+from ..scraper.watch_index import watch_index
 from ..core.logger import logger
+from ..core.settings import settings
 from urllib.parse import urlparse
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+import base64
+import hashlib
+import json
 
 router = APIRouter()
 
-# Garantir que as tabelas existam
-Base.metadata.create_all(bind=engine)
-
 @router.post("/track")
 def track(req: TrackRequest, db: Session = Depends(get_db)):
     domain = urlparse(str(req.url)).netloc.replace("www.", "")
@@ -40,37 +50,101 @@ def track(req: TrackRequest, db: Session = Depends(get_db)):
     )
     db.add(watch)
     db.commit()
+    watch_index.add(watch)
 
-    # opcional: forçar 1ª checagem
-    try:
-        updated = scrape_once(db, product)
-        logger.info(f"Primeira checagem feita para product={product.id} updated={updated}")
-    except Exception as e:
-        logger.warning(f"Falha na primeira checagem: {e}")
+    # 1ª checagem fica para a fila: a resposta não espera o site da loja
+    job = scrape_queue.submit(product.id)
+    logger.info({"event": "track", "product_id": product.id, "watch_id": watch.id, "job_id": job.id})
 
-    return {"product_id": product.id, "watch_id": watch.id}
+    return {
+        "product_id": product.id,
+        "watch_id": watch.id,
+        "job_id": job.id,
+        "status_url": f"/scrape-jobs/{job.id}",
+    }
+
+@router.get("/scrape-jobs/{job_id}")
+async def get_scrape_job(job_id: str):
+    job = scrape_queue.get(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Job não encontrado")
+    return job.as_dict()
 
 @router.get("/products/{product_id}", response_model=ProductOut)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.get(Product, product_id)
-    if not product:
-        raise HTTPException(404, detail="Produto não encontrado")
-    return product
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    key, body = response_cache.lookup("product", product_id)
+    if body is None:
+        product = await db.get(Product, product_id)
+        if not product:
+            raise HTTPException(404, detail="Produto não encontrado")
+        body = ProductOut.model_validate(product).model_dump_json().encode()
+        response_cache.store(key, body)
+    return Response(body, media_type="application/json")
 
 @router.get("/products/{product_id}/history")
-def get_history(product_id: int, days: int = Query(default=30, ge=1, le=365), db: Session = Depends(get_db)):
+async def get_history(
+    product_id: int,
+    days: int = Query(default=30, ge=1, le=365),
+    expand: bool = Query(default=False, description="devolve sequências como pontos"),
+    resolution: Resolution = Query(default="raw", description="raw, hour, day ou auto (pela janela)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if resolution == "auto":
+        resolution = pick_resolution(days)
+    key, body = response_cache.lookup("history", product_id, f"{days}:{int(expand)}:{resolution}")
+    if body is None:
+        body = JSONResponse(await history_points(db, product_id, days, expand, resolution)).body
+        response_cache.store(key, body)
+    return Response(body, media_type="application/json")
+
+
+async def history_points(db: AsyncSession, product_id: int, days: int, expand: bool, resolution: str) -> list:
     since = datetime.utcnow() - timedelta(days=days)
-    q = (
-        db.query(PriceHistory)
-        .filter(PriceHistory.product_id == product_id)
-        .filter(PriceHistory.captured_at >= since)
+    if resolution != "raw":
+        # agregados mantidos na ingestão: no máximo 24 pontos/dia ou 1 ponto/dia
+        model = PriceHourly if resolution == "hour" else PriceDaily
+        rows = await db.scalars(
+            select(model)
+            .where(model.product_id == product_id)
+            .where(model.bucket >= model.truncate(since))
+            .order_by(model.bucket.desc())
+        )
+        return [r.as_point() for r in rows]
+
+    # só as colunas, sem montar objetos ORM; a resposta já sai em tipos JSON,
+    # então dispensa o jsonable_encoder (que roda no event loop)
+    rows = await db.execute(
+        select(PriceHistory.price, PriceHistory.captured_at, PriceHistory.last_seen_at)
+        .where(PriceHistory.product_id == product_id)
+        .where(PriceHistory.seen_since(since))
         .order_by(PriceHistory.captured_at.desc())
     )
+    if expand:
+        return [
+            {"price": price, "captured_at": at.isoformat()}
+            for row in rows for price, at in PriceHistory.expand_run(*row)
+        ]
     return [
-        PricePoint(price=ph.price, captured_at=ph.captured_at.isoformat())
-        for ph in q.all()
+        {"price": price, "captured_at": captured_at.isoformat(),
+         "last_seen_at": last_seen_at.isoformat() if last_seen_at else None}
+        for price, captured_at, last_seen_at in rows
     ]
 
+
+def pick_resolution(days: int) -> str:
+    """A fonte mais barata para a janela: pontos crus em até 3 dias,
+    hora em até 2 semanas (≤ 336 pontos), dia acima disso (≤ 365)."""
+    if days <= 3:
+        return "raw"
+    if days <= 14:
+        return "hour"
+    return "day"
+
+@router.get("/cache-stats")
+async def cache_stats():
+    """Acertos/faltas do cache de respostas deste processo."""
+    return response_cache.stats()
+
 @router.post("/scrape-now")
 def scrape_now(product_id: int, db: Session = Depends(get_db)):
     product = db.get(Product, product_id)
@@ -79,7 +153,83 @@ def scrape_now(product_id: int, db: Session = Depends(get_db)):
     updated = scrape_once(db, product)
     return {"ok": True, "updated": updated}
 
+@router.post("/scrape-now/bulk")
+async def scrape_now_bulk(req: BulkScrapeRequest):
+    """Checa vários produtos (ids e/ou domínio) em paralelo, com os limites do
+    worker; responde em NDJSON, uma linha por produto na ordem em que terminam
+    e um resumo no final."""
+    if not req.product_ids and not req.domain:
+        raise HTTPException(400, detail="Defina product_ids ou domain")
+    if req.product_ids and len(req.product_ids) > settings.BULK_SCRAPE_MAX_PRODUCTS:
+        raise HTTPException(400, detail=f"No máximo {settings.BULK_SCRAPE_MAX_PRODUCTS} produtos por chamada")
+
+    async def lines():
+        async for item in scrape_many(req.product_ids, req.domain, settings.BULK_SCRAPE_MAX_PRODUCTS):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/products", response_model=list[ProductOut])
-def list_products(limit: int = Query(default=50, ge=1, le=100), db: Session = Depends(get_db)):
-    products = db.query(Product).order_by(Product.last_checked_at.desc()).limit(limit).all()
-    return products
+async def list_products(
+    request: Request,
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor da página anterior"),
+    since: Optional[datetime] = Query(default=None, description="só produtos alterados depois disso"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Produtos por keyset em (updated_at, id): mais recentes primeiro, ou,
+    com `since`, só os alterados depois dele (mais antigos primeiro). A
+    próxima página vem em `X-Next-Cursor`/`Link`; o ETag permite 304."""
+    after = decode_cursor(cursor)
+    if since is not None:
+        if since.tzinfo is not None:
+            # o banco guarda UTC sem fuso
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        # um lote carimbado antes do `since` pode ter sido confirmado depois
+        # dele: repete a janela (o cliente recebe alguns de novo, por id)
+        since -= timedelta(seconds=settings.PRODUCTS_SINCE_OVERLAP_SECONDS)
+    columns = [getattr(Product, name) for name in ProductOut.model_fields]
+    rows = (await db.execute(Product.page(*columns, limit=limit, after=after, since=since))).all()
+    items = [
+        {name: value.isoformat() if isinstance(value, datetime) else value for name, value in row._mapping.items()}
+        for row in rows
+    ]
+
+    headers = {"Cache-Control": "no-cache"}
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    response = JSONResponse(items, headers=headers)
+    etag = strong_etag(response.body)
+    tags = if_none_match(request)
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+    response.headers["ETag"] = etag
+    return response
+
+
+def encode_cursor(updated_at: datetime, product_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{updated_at.isoformat()}|{product_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        updated_at, product_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(updated_at), int(product_id)
+    except ValueError:
+        raise HTTPException(400, detail="Cursor inválido")
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def if_none_match(request: Request) -> set:
+    # If-None-Match compara sem o prefixo W/ (comparação fraca, RFC 9110)
+    header = request.headers.get("if-none-match", "")
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
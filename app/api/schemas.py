@@ -1,7 +1,9 @@
 from pydantic import BaseModel, AnyUrl, field_validator, EmailStr
-from typing import Optional, Literal
+from typing import List, Optional, Literal
+from datetime import datetime
 
 Channel = Literal["email", "webpush", "telegram", "discord"]
+Resolution = Literal["raw", "hour", "day", "auto"]
 
 class TrackRequest(BaseModel):
     url: AnyUrl
@@ -17,6 +19,10 @@ class TrackRequest(BaseModel):
             raise ValueError("deve ser >= 0")
         return v
 
+class BulkScrapeRequest(BaseModel):
+    product_ids: Optional[List[int]] = None
+    domain: Optional[str] = None  # ex: "magazineluiza.com.br"
+
 class ProductOut(BaseModel):
     id: int
     url: str
@@ -24,7 +30,11 @@ class ProductOut(BaseModel):
     title: Optional[str]
     currency: str
     current_price: Optional[float]
+    previous_price: Optional[float] = None
+    lowest_price: Optional[float] = None
+    price_changed_at: Optional[datetime] = None
     in_stock: Optional[bool]
+    updated_at: Optional[datetime] = None  # última mudança visível (GET /products?since=)
 
     class Config:
         from_attributes = True
@@ -32,3 +42,4 @@ class ProductOut(BaseModel):
 class PricePoint(BaseModel):
     price: float
     captured_at: str
+    last_seen_at: Optional[str] = None  # fim da sequência (PRICE_HISTORY_MODE=runs)
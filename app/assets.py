@@ -0,0 +1,108 @@
+"""Arquivos do painel (/ui) montados uma vez e servidos pré-comprimidos.
+
+Na primeira chamada (o startup da API chama `build_dashboard`) os arquivos de
+`app/static/ui` são lidos, o CSS e o JS ganham o hash do conteúdo no nome e
+cada arquivo é comprimido em gzip e, se o pacote `brotli` estiver instalado,
+em brotli. Depois disso cada requisição só escolhe a variante pelo
+`Accept-Encoding`:
+
+- CSS/JS (nome com hash): `Cache-Control: immutable` por um ano;
+- o HTML (/ui) muda de conteúdo sem mudar de URL: revalida por ETag (304).
+"""
+import gzip
+import hashlib
+import importlib.util
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from .core.logger import logger
+
+UI_DIR = Path(__file__).parent / "static" / "ui"
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# melhor compressão primeiro
+ENCODINGS = ("br", "gzip")
+
+
+def _compress(data: bytes) -> Dict[str, bytes]:
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if importlib.util.find_spec("brotli") is not None:
+        import brotli
+
+        variants["br"] = brotli.compress(data, quality=11)
+    # só guarda a variante se ela for de fato menor
+    return {enc: body for enc, body in variants.items() if len(body) < len(data)}
+
+
+def accepted_encodings(request: Request) -> set:
+    accepted = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.strip())
+    return accepted
+
+
+@dataclass
+class Asset:
+    body: bytes
+    media_type: str
+    cache_control: str
+    digest: str = ""
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, body: bytes, media_type: str, cache_control: str) -> "Asset":
+        return cls(body, media_type, cache_control, hashlib.sha256(body).hexdigest()[:16], _compress(body))
+
+    def etag(self, encoding: Optional[str]) -> str:
+        # ETag forte é por representação: cada codificação tem o seu
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def respond(self, request: Request) -> Response:
+        encoding = next((e for e in ENCODINGS if e in accepted_encodings(request) and e in self.variants), None)
+        headers = {"Cache-Control": self.cache_control, "ETag": self.etag(encoding), "Vary": "Accept-Encoding"}
+        tags = {t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")}
+        if self.etag(encoding) in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants.get(encoding, self.body), media_type=self.media_type, headers=headers)
+
+
+@dataclass
+class Dashboard:
+    page: Asset
+    assets: Dict[str, Asset]  # nome com hash -> arquivo
+
+
+_dashboard: Optional[Dashboard] = None
+
+
+def build_dashboard() -> Dashboard:
+    global _dashboard
+    if _dashboard is not None:
+        return _dashboard
+    assets, names = {}, {}
+    for source, media_type in (("dashboard.css", "text/css; charset=utf-8"),
+                               ("dashboard.js", "application/javascript; charset=utf-8")):
+        asset = Asset.build((UI_DIR / source).read_bytes(), media_type, IMMUTABLE)
+        stem, ext = source.rsplit(".", 1)
+        names[ext] = f"{stem}.{asset.digest}.{ext}"
+        assets[names[ext]] = asset
+    html = (
+        (UI_DIR / "index.html").read_text(encoding="utf-8")
+        .replace("{css}", f"/ui/assets/{names['css']}")
+        .replace("{js}", f"/ui/assets/{names['js']}")
+    )
+    page = Asset.build(html.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE)
+    _dashboard = Dashboard(page, assets)
+    logger.info({
+        "event": "dashboard_built",
+        **{name: {"raw": len(a.body), **{enc: len(b) for enc, b in a.variants.items()}}
+           for name, a in {"index.html": page, **assets}.items()},
+    })
+    return _dashboard
@@ -0,0 +1,142 @@
+"""Cache das respostas de leitura da API (produto e histórico).
+
+As respostas são guardadas já serializadas (bytes JSON). Cada produto tem
+uma versão no próprio backend e ela entra na chave: quando o scraper grava
+uma checagem com preço, título ou estoque, `invalidate` troca a versão e
+todas as respostas daquele produto (qualquer combinação de parâmetros)
+deixam de ser encontradas. Uma versão que sumiu (TTL/LRU) é recriada com
+valor novo, então nunca volta a apontar para uma resposta antiga.
+
+O backend padrão é um LRU com TTL em memória (RESPONSE_CACHE_MAX_ENTRIES,
+RESPONSE_CACHE_TTL). RESPONSE_CACHE_BACKEND aceita outra classe
+(`pacote.modulo:Classe`) com `get(key)` e `set(key, value, ttl)`; com um
+backend compartilhado entre API e worker, os preços gravados pelo worker
+também invalidam o cache da API. Com o backend em memória, o que o worker
+grava aparece na API em até RESPONSE_CACHE_TTL segundos.
+"""
+import importlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Iterable, Optional, Protocol, Tuple
+
+from .settings import settings
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+
+class MemoryBackend:
+    """LRU limitado por número de entradas, com expiração por entrada."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self._data: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def load_backend(path: Optional[str]) -> CacheBackend:
+    if not path:
+        return MemoryBackend()
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = None):
+        self.backend = backend
+        self.ttl = settings.RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _backend(self) -> CacheBackend:
+        if self.backend is None:
+            self.backend = load_backend(settings.RESPONSE_CACHE_BACKEND)
+        return self.backend
+
+    def _version(self, product_id: int) -> str:
+        key = f"ver:{product_id}"
+        version = self._backend().get(key)
+        if version is None:
+            version = uuid.uuid4().hex.encode()
+            # a versão vive mais que as respostas que dependem dela
+            self._backend().set(key, version, self.ttl * 10)
+        return version.decode()
+
+    def lookup(self, kind: str, product_id: int, params: str = "") -> Tuple[Optional[str], Optional[bytes]]:
+        """Chave atual e resposta guardada (se houver).
+
+        Em caso de falta, grave com `store(key, ...)` usando esta chave: a
+        versão foi lida antes da consulta ao banco, então uma invalidação no
+        meio do caminho descarta o que for gravado.
+        """
+        if not self.enabled:
+            return None, None
+        key = f"{kind}:{product_id}:{self._version(product_id)}:{params}"
+        body = self._backend().get(key)
+        with self._lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return key, body
+
+    def store(self, key: Optional[str], body: bytes):
+        if key is not None:
+            self._backend().set(key, body, self.ttl)
+
+    def invalidate(self, product_ids: Iterable[int]):
+        """Descarta as respostas dos produtos (nova versão de cada um)."""
+        if not self.enabled:
+            return
+        count = 0
+        for product_id in product_ids:
+            self._backend().set(f"ver:{product_id}", uuid.uuid4().hex.encode(), self.ttl * 10)
+            count += 1
+        with self._lock:
+            self.invalidations += count
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "event": "response_cache",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+            "entries": len(self.backend) if isinstance(self.backend, MemoryBackend) else None,
+        }
+
+
+response_cache = ResponseCache()
@@ -1,4 +1,7 @@
+from typing import Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .settings import settings
 
@@ -16,3 +19,42 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Engine assíncrono para as rotas de leitura: a consulta não ocupa uma
+# thread do threadpool do FastAPI enquanto espera o banco.
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session: Optional[async_sessionmaker] = None
+
+
+def async_url(url: str) -> str:
+    """DATABASE_URL com o driver assíncrono equivalente (aiosqlite/asyncpg)."""
+    u = make_url(url)
+    return u.set(drivername=ASYNC_DRIVERS.get(u.get_backend_name(), u.drivername)).render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _async_session
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            async_url(settings.DATABASE_URL),
+            pool_size=settings.DB_ASYNC_POOL_SIZE,
+            max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+        )
+        _async_session = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_engine
+
+
+async def get_async_db():
+    get_async_engine()
+    async with _async_session() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_session
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_session = None
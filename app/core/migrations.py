@@ -0,0 +1,141 @@
+"""Migrações de schema (Alembic) e checagem dos planos das consultas quentes.
+
+    python -m app.core.migrations upgrade       # aplica as migrações pendentes
+    python -m app.core.migrations check-plans   # confere uso dos índices (histórico, products)
+    python -m app.core.migrations compact-history  # junta preços repetidos em sequências
+"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import bindparam, delete, inspect, select, update
+
+from .db import engine
+from .logger import logger
+
+ROOT = Path(__file__).resolve().parents[2]
+BASELINE = "0001"
+HISTORY_INDEX = "ix_price_history_product_captured"
+PRODUCTS_INDEX = "ix_products_updated"
+
+
+def alembic_config() -> Config:
+    cfg = Config(str(ROOT / "alembic.ini"))
+    cfg.set_main_option("script_location", str(ROOT / "migrations"))
+    # o logging da aplicação é o loguru; não deixar o fileConfig mexer nele
+    cfg.attributes["configure_logger"] = False
+    return cfg
+
+
+def upgrade_db():
+    """Leva o banco até a última revisão.
+
+    Bancos criados pelo antigo `Base.metadata.create_all` não têm a tabela
+    `alembic_version`; eles são marcados na revisão inicial antes do upgrade.
+    """
+    cfg = alembic_config()
+    tables = inspect(engine).get_table_names()
+    if "products" in tables and "alembic_version" not in tables:
+        logger.info("Banco sem controle de versão: marcando revisão inicial")
+        command.stamp(cfg, BASELINE)
+    command.upgrade(cfg, "head")
+
+
+def hot_queries():
+    """As consultas quentes e o índice que cada uma precisa usar."""
+    from ..models.price_history import PriceHistory
+    from ..models.product import Product
+
+    since = datetime.utcnow() - timedelta(days=30)
+    by_product = select(PriceHistory).where(PriceHistory.product_id == 1)
+    return {
+        # GET /products/{id}/history
+        "history": (HISTORY_INDEX, by_product.where(PriceHistory.seen_since(since))
+                    .order_by(PriceHistory.captured_at.desc())),
+        # /ui/history/{id}
+        "history_page": (HISTORY_INDEX, by_product.where(PriceHistory.seen_since(since))
+                         .order_by(PriceHistory.captured_at.desc()).limit(10)),
+        # GET /products (página seguinte) e GET /products?since=
+        "products_page": (PRODUCTS_INDEX, Product.page(Product.id, limit=50, after=(since, 10))),
+        "products_since": (PRODUCTS_INDEX, Product.page(Product.id, limit=50, since=since)),
+    }
+
+
+def explain(conn, stmt) -> str:
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[k] for k in compiled.positiontup) if compiled.positional else compiled.params
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).all()
+        return "\n".join(row[-1] for row in rows)
+    rows = conn.exec_driver_sql("EXPLAIN " + str(compiled), params).all()
+    return "\n".join(row[0] for row in rows)
+
+
+def check_query_plans() -> dict:
+    """Plano de cada consulta quente; AssertionError se alguma não usa o índice
+    ou ainda precisa ordenar o resultado."""
+    plans = {}
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # tabela pequena faz o planner preferir seq scan; queremos saber
+            # se o índice *serve* para a consulta
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, (index, stmt) in hot_queries().items():
+            plan = explain(conn, stmt)
+            plans[name] = plan
+            assert index in plan, f"{name} não usa {index}:\n{plan}"
+            assert "TEMP B-TREE" not in plan and "Sort" not in plan, f"{name} ainda ordena:\n{plan}"
+        conn.rollback()
+    return plans
+
+
+def compact_history(batch_size: int = 1000) -> int:
+    """Junta linhas consecutivas com o mesmo preço em uma sequência
+    (`captured_at` da primeira, `last_seen_at` da última). Retorna quantas
+    linhas foram removidas."""
+    from ..models.price_history import PriceHistory
+
+    removed = 0
+    with engine.begin() as conn:
+        product_ids = conn.execute(select(PriceHistory.product_id).distinct()).scalars().all()
+    for i in range(0, len(product_ids), batch_size):
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(PriceHistory.id, PriceHistory.product_id, PriceHistory.price,
+                       PriceHistory.captured_at, PriceHistory.last_seen_at)
+                .where(PriceHistory.product_id.in_(product_ids[i:i + batch_size]))
+                .order_by(PriceHistory.product_id, PriceHistory.captured_at)
+            ).all()
+            head, extend, drop = None, {}, []
+            for row in rows:
+                if head is not None and row.product_id == head.product_id and row.price == head.price:
+                    extend[head.id] = row.last_seen_at or row.captured_at
+                    drop.append(row.id)
+                else:
+                    head = row
+            if extend:
+                conn.execute(
+                    update(PriceHistory).where(PriceHistory.id == bindparam("b_id"))
+                    .values(last_seen_at=bindparam("b_seen")),
+                    [{"b_id": k, "b_seen": v} for k, v in extend.items()],
+                )
+                for j in range(0, len(drop), 500):
+                    conn.execute(delete(PriceHistory).where(PriceHistory.id.in_(drop[j:j + 500])))
+            removed += len(drop)
+    logger.info({"event": "history_compacted", "removed": removed})
+    return removed
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if cmd == "upgrade":
+        upgrade_db()
+    elif cmd == "compact-history":
+        print(f"{compact_history()} linhas removidas")
+    elif cmd == "check-plans":
+        for name, plan in check_query_plans().items():
+            print(f"[ok] {name}\n    " + plan.replace("\n", "\n    "))
+    else:
+        sys.exit(f"comando desconhecido: {cmd}")
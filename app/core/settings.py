@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Dict, List, Literal, Optional
 
 class Settings(BaseSettings):
     ENV: str = Field(default="dev")
@@ -9,16 +10,107 @@ class Settings(BaseSettings):
     API_PORT: int = Field(default=8000)
 
     DATABASE_URL: str = Field(default="sqlite:///./data.db")
+    DB_ASYNC_POOL_SIZE: int = 20      # conexões do engine assíncrono (rotas de leitura)
+    DB_ASYNC_MAX_OVERFLOW: int = 20
 
     VAPID_PRIVATE_KEY: str = ""
     VAPID_PUBLIC_KEY: str = ""
     VAPID_CLAIMS_SUB: str = "mailto:you@example.com"
+    WEBPUSH_CONCURRENCY: int = 50          # envios simultâneos
+    WEBPUSH_CRYPTO_WORKERS: int = 4        # threads de criptografia do payload
+    WEBPUSH_VAPID_TTL: int = 12 * 3600     # validade do token VAPID (máx. 24h)
+    WEBPUSH_MESSAGE_TTL: int = 24 * 3600   # quanto o serviço guarda a mensagem offline
+    WEBPUSH_TIMEOUT: float = 10.0
 
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
     SMTP_USER: str = ""
     SMTP_PASS: str = ""
     SMTP_FROM: str = "Derrubador <alerts@derruba.dev>"
+    SMTP_STARTTLS: bool = True            # obrigatório; false só para servidor local de teste
+    SMTP_TIMEOUT: float = 30.0
+    SMTP_POOL_SIZE: int = 4               # conexões autenticadas abertas
+    SMTP_MAX_MESSAGES_PER_CONN: int = 100
+    SMTP_IDLE_SECONDS: float = 60.0       # conexão parada por mais que isso é refeita
+
+    # Scraping concorrente (worker)
+    SCRAPE_CONCURRENCY: int = 20      # requisições simultâneas no total
+    SCRAPE_PER_DOMAIN: int = 4        # requisições simultâneas por domínio
+    SCRAPE_TIMEOUT: float = 15.0
+    PARSE_WORKERS: Optional[int] = None  # processos de parse (padrão: nº de núcleos; 0 = inline)
+    PIPELINE_QUEUE_SIZE: int = 100       # fila entre fetch → parse → gravação
+    PERSIST_BATCH_SIZE: int = 200        # produtos por commit
+    PERSIST_FLUSH_SECONDS: float = 2.0   # ou a cada T segundos
+    # "runs": preço repetido só estende a linha atual do histórico;
+    # "points": uma linha por checagem
+    PRICE_HISTORY_MODE: Literal["points", "runs"] = "runs"
+    # Checagens pedidas pela API (/track), fora da requisição
+    SCRAPE_QUEUE_WORKERS: int = 4
+    SCRAPE_QUEUE_MAX_JOBS: int = 1000    # status guardados em memória
+    BULK_SCRAPE_MAX_PRODUCTS: int = 500  # por chamada de /scrape-now/bulk
+
+    # GET /products?since=: também devolve o que mudou até N s antes do `since`.
+    # Vários escritores (worker, /scrape-now, /track, bulk) gravam em paralelo e
+    # um lote carimbado antes pode ser confirmado depois de outro
+    PRODUCTS_SINCE_OVERLAP_SECONDS: float = 60.0
+
+    # Cache das respostas de GET /products/{id} e /history (app.core.cache)
+    RESPONSE_CACHE_TTL: float = 60.0            # s; 0 desliga
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    RESPONSE_CACHE_BACKEND: Optional[str] = None  # "pacote.modulo:Classe"; padrão: LRU em memória
+
+    # Agendamento adaptativo (worker)
+    SCHEDULER_TICK_SECONDS: int = 60
+    SCHEDULE_BATCH_SIZE: int = 500              # máx. de produtos por tick
+    SCHEDULE_MIN_INTERVAL_MINUTES: int = 30
+    SCHEDULE_MAX_INTERVAL_HOURS: int = 24
+    SCHEDULE_DEFAULT_INTERVAL_HOURS: int = 3    # sem histórico suficiente
+    SCHEDULE_WINDOW_DAYS: int = 14              # janela para medir volatilidade
+    SCHEDULE_WATCHED_FACTOR: float = 0.5        # produtos com watch ativo
+
+    # Índice em memória dos watches (triggers); recarregado a cada TTL para
+    # ver watches criados por outro processo
+    WATCH_INDEX_TTL_SECONDS: float = 60.0
+    # watch que já disparou só volta a disparar se o preço cair mais ou
+    # depois desse tempo, enquanto a condição durar (uma checagem sem
+    # disparo rearma o watch)
+    TRIGGER_COOLDOWN_HOURS: float = 24.0
+
+    # Outbox de notificações (dispatcher no worker, um job por canal)
+    NOTIFY_CHANNELS: List[str] = ["email", "webpush", "telegram", "discord"]
+    NOTIFY_WORKERS_DEFAULT: int = 4             # envios simultâneos por canal
+    NOTIFY_WORKERS: Dict[str, int] = {}         # ex: {"webpush": 16}
+    NOTIFY_POLL_SECONDS: int = 5
+    NOTIFY_BATCH_SIZE: int = 50
+    NOTIFY_MAX_ATTEMPTS: int = 5
+    NOTIFY_RETRY_BASE: float = 30.0             # s, dobra a cada tentativa
+    NOTIFY_LEASE_SECONDS: int = 120             # reserva de um lote; depois disso é reenviado
+
+    # Limite por domínio (token bucket) e backoff em 429/503
+    RATE_LIMIT_DEFAULT: float = 2.0             # req/s por domínio
+    RATE_LIMIT_BURST: int = 4
+    RATE_LIMITS: Dict[str, float] = {}          # ex: {"magazineluiza.com.br": 5}
+    RATE_LIMIT_BACKOFF_BASE: float = 5.0        # s, dobra a cada falha seguida
+    RATE_LIMIT_BACKOFF_MAX: float = 900.0
+    RATE_LIMIT_MAX_RETRIES: int = 2
+    RATE_LIMIT_MAX_WAIT: float = 60.0           # acima disso falha e tenta no próximo ciclo
+
+    # Trechos removidos antes do hash do conteúdo (regex sobre bytes); se o
+    # hash bate com o da última checagem, o parse é pulado
+    CONTENT_HASH_STRIP_PATTERNS: List[str] = [
+        r"<!--.*?-->",
+        r"\bnonce=\"[^\"]*\"",
+        r"(?i:csrf|xsrf|request)[_-]?(?i:token|id)[\"']?\s*[:=]\s*[\"'][^\"']*[\"']",
+        r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?",
+        r"\b1\d{9}(?:\d{3})?\b",
+    ]
+
+    # Pool HTTP compartilhado (worker, /scrape-now e /track)
+    HTTP_HTTP2: bool = True           # requer o pacote h2 (httpx[http2])
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE: int = 40
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP_MAX_PER_HOST: int = 6        # conexões simultâneas por host
 
     class Config:
         env_file = ".env"
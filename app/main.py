@@ -5,8 +5,14 @@ from fastapi.staticfiles import StaticFiles
 
 from .api.routes import router as api_router
 from .ui import router as ui_router
-from .core.db import Base, engine
+from .assets import build_dashboard
+from .core.cache import response_cache
+from .core.db import dispose_async_engine
+from .core.migrations import upgrade_db
 from .core.logger import logger
+from .scraper import http as scraper_http
+from .scraper.engine import shutdown_parse_pool
+from .scraper.queue import scrape_queue
 
 app = FastAPI(title="Derrubador de Preços")
 
@@ -17,6 +23,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Link", "X-Next-Cursor"],  # paginação/304 de GET /products
 )
 
 # Arquivos estáticos
@@ -28,9 +35,18 @@ app.include_router(ui_router)
 
 @app.on_event("startup")
 def on_start():
-    Base.metadata.create_all(bind=engine)
+    upgrade_db()
+    build_dashboard()
     logger.info("API iniciada 🚀")
 
+@app.on_event("shutdown")
+async def on_stop():
+    logger.info(response_cache.stats())
+    scrape_queue.close()
+    await dispose_async_engine()
+    shutdown_parse_pool()
+    scraper_http.close()
+
 @app.get("/", include_in_schema=False)
 def root():
     return RedirectResponse(url="/ui")
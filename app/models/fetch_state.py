@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, ForeignKey, String, Float, Boolean
+from ..core.db import Base
+
+class FetchState(Base):
+    """Estado da última resposta completa de cada produto.
+
+    Validadores HTTP para GET condicional e hash normalizado do conteúdo,
+    junto do resultado do parse daquela versão da página.
+    """
+    __tablename__ = "fetch_state"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    etag = Column(String)
+    last_modified = Column(String)
+    content_hash = Column(String(32))
+    title = Column(String)
+    price = Column(Float)
+    in_stock = Column(Boolean)
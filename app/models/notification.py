@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, ForeignKey, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from ..core.db import Base
+
+class Notification(Base):
+    """Outbox de notificações.
+
+    Gravada na mesma transação do preço que disparou o watch; o dispatcher
+    (`app.notifier.dispatcher`) envia e marca como enviada. Uma linha pega
+    por um dispatcher fica reservada até `locked_until`; se ele morrer no
+    meio, outro reenvia depois disso (entrega pelo menos uma vez).
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True)
+    watch_id = Column(Integer, ForeignKey("watches.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    channel = Column(String, nullable=False)
+    endpoint = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)                 # JSON
+    status = Column(String, nullable=False, default="pending")  # pending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    locked_until = Column(DateTime(timezone=True))
+    claimed_by = Column(String)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # fila de cada canal: pendentes pela ordem do próximo envio
+        Index("ix_notification_outbox_queue", channel, status, next_attempt_at),
+    )
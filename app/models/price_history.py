@@ -1,11 +1,42 @@
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, Index, or_
 from sqlalchemy.sql import func
 from ..core.db import Base
 
 class PriceHistory(Base):
+    """Um preço observado.
+
+    No modo "runs" (PRICE_HISTORY_MODE) cada linha é uma sequência de
+    checagens com o mesmo preço: `captured_at` é a primeira e `last_seen_at`
+    a última. No modo "points" cada checagem é uma linha (`last_seen_at`
+    nulo).
+    """
     __tablename__ = "price_history"
 
     id = Column(Integer, primary_key=True)
-    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), index=True, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     price = Column(Float, nullable=False)
     captured_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # histórico por produto, sempre do mais recente para o mais antigo
+        Index("ix_price_history_product_captured", product_id, captured_at.desc()),
+    )
+
+    @classmethod
+    def seen_since(cls, since: datetime):
+        """Filtro das linhas vistas desde `since` (pontos ou sequências)."""
+        return or_(cls.captured_at >= since, cls.last_seen_at >= since)
+
+    def expand(self) -> List[Tuple[float, datetime]]:
+        return self.expand_run(self.price, self.captured_at, self.last_seen_at)
+
+    @staticmethod
+    def expand_run(price: float, captured_at: datetime, last_seen_at: Optional[datetime]) -> List[Tuple[float, datetime]]:
+        """A sequência de volta em pontos (mais recente primeiro): a última e a
+        primeira checagem com esse preço."""
+        if last_seen_at is None or last_seen_at == captured_at:
+            return [(price, captured_at)]
+        return [(price, last_seen_at), (price, captured_at)]
@@ -0,0 +1,55 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime
+from sqlalchemy.orm import declared_attr
+from ..core.db import Base
+
+class _Rollup:
+    """Agregado do preço de um produto num intervalo (hora ou dia, em UTC).
+
+    Mantido a cada gravação de preço pelo `BatchWriter`; a média é
+    `sum_price / samples`.
+    """
+    @declared_attr
+    def product_id(cls):
+        return Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # início do intervalo
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    sum_price = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False)
+    last_price = Column(Float, nullable=False)
+    last_at = Column(DateTime(timezone=True), nullable=False)
+
+    @staticmethod
+    def truncate(at: datetime) -> datetime:
+        raise NotImplementedError
+
+    def as_point(self) -> dict:
+        return {
+            "price": self.last_price,
+            "captured_at": self.bucket.isoformat(),
+            "min": self.min_price,
+            "max": self.max_price,
+            "avg": round(self.sum_price / self.samples, 2),
+            "samples": self.samples,
+        }
+
+
+class PriceHourly(_Rollup, Base):
+    __tablename__ = "price_rollup_hour"
+
+    @staticmethod
+    def truncate(at: datetime) -> datetime:
+        return at.replace(minute=0, second=0, microsecond=0)
+
+
+class PriceDaily(_Rollup, Base):
+    __tablename__ = "price_rollup_day"
+
+    @staticmethod
+    def truncate(at: datetime) -> datetime:
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+ROLLUPS = (PriceHourly, PriceDaily)
@@ -1,7 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Index, or_, select
 from sqlalchemy.sql import func
 from ..core.db import Base
 
+# campos que a API devolve e que mudam com o scraping: alterar um deles
+# avança `updated_at`
+VISIBLE_COLUMNS = ("current_price", "title", "in_stock")
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -11,5 +17,38 @@ class Product(Base):
     title = Column(String)
     currency = Column(String, default="BRL")
     current_price = Column(Float)
+    # estado derivado do histórico, mantido a cada gravação de preço
+    previous_price = Column(Float)                        # preço antes da última mudança
+    lowest_price = Column(Float)                          # menor preço já visto
+    price_changed_at = Column(DateTime(timezone=True))    # quando o preço mudou pela última vez
     in_stock = Column(Boolean, default=True)
     last_checked_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # última mudança visível (preço, título, estoque); checagem sem mudança não mexe
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # listagem paginada (keyset) e delta `since=` de GET /products
+        Index("ix_products_updated", updated_at, id),
+    )
+
+    @classmethod
+    def page(cls, *columns, limit: int, after: Optional[Tuple[datetime, int]] = None,
+             since: Optional[datetime] = None):
+        """Uma página por keyset em (updated_at, id).
+
+        Sem `since`: do mais recente para o mais antigo. Com `since`: só o
+        que mudou depois dele, do mais antigo para o mais recente (o último
+        item é o novo ponto de partida). `after` é a chave do último item da
+        página anterior.
+        """
+        stmt = select(*columns).limit(limit)
+        if since is not None:
+            stmt = stmt.where(cls.updated_at > since).order_by(cls.updated_at, cls.id)
+            if after is not None:
+                stmt = stmt.where(cls.updated_at >= after[0], or_(cls.updated_at > after[0], cls.id > after[1]))
+            return stmt
+        stmt = stmt.order_by(cls.updated_at.desc(), cls.id.desc())
+        if after is not None:
+            # a condição redundante em updated_at vira busca por faixa no índice
+            stmt = stmt.where(cls.updated_at <= after[0], or_(cls.updated_at < after[0], cls.id < after[1]))
+        return stmt
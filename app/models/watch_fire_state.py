@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime
+from ..core.db import Base
+
+class WatchFireState(Base):
+    """Último disparo de cada watch (cooldown/debounce das notificações).
+
+    Uma linha por watch, lida pela chave primária.
+    """
+    __tablename__ = "watch_fire_state"
+
+    watch_id = Column(Integer, ForeignKey("watches.id", ondelete="CASCADE"), primary_key=True)
+    last_price = Column(Float, nullable=False)                    # preço do último disparo
+    fired_at = Column(DateTime(timezone=True), nullable=False)
+    cooldown_until = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,190 @@
+"""Envio das notificações da outbox.
+
+Cada canal tem seu pool de threads e é drenado por conta própria: um SMTP
+lento não segura o web push, e nenhum dos dois segura o scraping, que só
+grava na outbox.
+
+O dispatcher reserva um lote de linhas pendentes (`claimed_by` +
+`locked_until`), envia em paralelo e grava o resultado. Falhas voltam para
+a fila com backoff exponencial até NOTIFY_MAX_ATTEMPTS; se o processo morre
+no meio, a reserva expira e outro dispatcher reenvia (pelo menos uma vez).
+O worker roda um job por canal (`app.worker`).
+"""
+import html
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from ..core.db import SessionLocal
+from ..core.settings import settings
+from ..core.logger import logger
+from ..models.notification import Notification
+from ..models.watch import Watch
+from ..scraper.watch_index import watch_index
+from .webpush import SubscriptionExpired
+
+
+def _send_email(endpoint: str, payload: dict):
+    from .email import send_email
+
+    title = payload.get("title") or "Produto"
+    # título e URL vêm da página da loja: nunca entram crus no HTML
+    body = (
+        f"<p><b>{html.escape(title)}</b> está por R$ {payload['price']:.2f}</p>"
+        f"<p>{html.escape(payload.get('reason') or '')}</p>"
+        f"<p><a href=\"{html.escape(payload.get('url') or '', quote=True)}\">Ver produto</a></p>"
+    )
+    send_email(endpoint, f"Derrubou! {title}", body)
+
+
+def _send_webpush_batch(messages: List[Tuple[str, dict]]) -> List[Optional[Exception]]:
+    from .webpush import send_webpush_many, subscription_of
+
+    return send_webpush_many([(subscription_of(endpoint), payload) for endpoint, payload in messages])
+
+
+SENDERS: Dict[str, Callable[[str, dict], None]] = {
+    "email": _send_email,
+}
+# canais que enviam o lote inteiro de uma vez (assíncrono)
+BATCH_SENDERS: Dict[str, Callable[[List[Tuple[str, dict]]], List[Optional[Exception]]]] = {
+    "webpush": _send_webpush_batch,
+}
+
+
+def workers_for(channel: str) -> int:
+    return settings.NOTIFY_WORKERS.get(channel, settings.NOTIFY_WORKERS_DEFAULT)
+
+
+class OutboxDispatcher:
+    def __init__(self, channel: str, sender: Optional[Callable[[str, dict], None]] = None):
+        self.channel = channel
+        self.sender = sender or SENDERS.get(channel)
+        self.batch_sender = BATCH_SENDERS.get(channel) if sender is None else None
+        self.workers = workers_for(channel)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"notify-{channel}")
+        self.token = uuid.uuid4().hex
+
+    def claim(self, db: Session, limit: int) -> List[Notification]:
+        """Reserva até `limit` notificações vencidas deste canal."""
+        now = datetime.utcnow()
+        due = (
+            select(Notification.id)
+            .where(Notification.channel == self.channel, Notification.status == "pending")
+            .where(Notification.next_attempt_at <= now)
+            .where(or_(Notification.locked_until.is_(None), Notification.locked_until < now))
+            .order_by(Notification.next_attempt_at)
+            .limit(limit)
+        )
+        ids = db.execute(due).scalars().all()
+        if not ids:
+            return []
+        claim = uuid.uuid4().hex
+        # o WHERE repete a condição: quem reservou antes fica com a linha
+        db.execute(
+            update(Notification)
+            .where(Notification.id.in_(ids), Notification.status == "pending")
+            .where(Notification.next_attempt_at <= now)
+            .where(or_(Notification.locked_until.is_(None), Notification.locked_until < now))
+            .values(claimed_by=f"{self.token}:{claim}",
+                    locked_until=now + timedelta(seconds=settings.NOTIFY_LEASE_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return db.query(Notification).filter(Notification.claimed_by == f"{self.token}:{claim}").all()
+
+    def _deliver(self, message: Tuple[str, dict]) -> Optional[Exception]:
+        """Envia (endpoint, payload); devolve o erro ou None."""
+        try:
+            self.sender(*message)
+            return None
+        except Exception as e:
+            return e
+
+    def _send(self, messages: List[Tuple[str, dict]]) -> List[Optional[Exception]]:
+        if self.batch_sender is not None:
+            return self.batch_sender(messages)
+        if self.sender is None:
+            return [LookupError(f"canal sem envio: {self.channel}")] * len(messages)
+        return list(self.pool.map(self._deliver, messages))
+
+    def run_once(self, db: Session) -> dict:
+        """Drena um lote do canal. Devolve contagem de enviadas/falhas."""
+        batch = self.claim(db, settings.NOTIFY_BATCH_SIZE)
+        if not batch:
+            return {"sent": 0, "retry": 0, "failed": 0}
+        started = time.perf_counter()
+        # os envios só recebem valores simples, nunca objetos da Session
+        errors = self._send([(n.endpoint, json.loads(n.payload)) for n in batch])
+
+        stats = {"sent": 0, "retry": 0, "failed": 0}
+        expired = set()
+        now = datetime.utcnow()
+        for n, error in zip(batch, errors):
+            n.claimed_by = None
+            n.locked_until = None
+            if error is None:
+                n.status, n.sent_at = "sent", now
+                stats["sent"] += 1
+                continue
+            n.attempts += 1
+            n.last_error = str(error) or error.__class__.__name__
+            if isinstance(error, (SubscriptionExpired, LookupError)) or n.attempts >= settings.NOTIFY_MAX_ATTEMPTS:
+                n.status = "failed"
+                stats["failed"] += 1
+                if isinstance(error, SubscriptionExpired):
+                    expired.add(n.endpoint)
+            else:
+                delay = settings.NOTIFY_RETRY_BASE * 2 ** (n.attempts - 1)
+                n.next_attempt_at = now + timedelta(seconds=delay)
+                stats["retry"] += 1
+        if expired:
+            self.prune(db, expired)
+        db.commit()
+        logger.info({"event": "notify_batch", "channel": self.channel, **stats,
+                     "elapsed_s": round(time.perf_counter() - started, 2)})
+        return stats
+
+    def prune(self, db: Session, endpoints: set):
+        """Desativa os watches de inscrições expiradas e descarta o que ainda
+        estava na fila para elas."""
+        db.execute(
+            update(Watch)
+            .where(Watch.channel == self.channel, Watch.endpoint.in_(endpoints))
+            .values(active=False)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            update(Notification)
+            .where(Notification.channel == self.channel, Notification.status == "pending")
+            .where(Notification.endpoint.in_(endpoints))
+            .values(status="failed", last_error="inscrição expirada")
+            .execution_options(synchronize_session=False)
+        )
+        watch_index.invalidate()
+        logger.info({"event": "subscriptions_pruned", "channel": self.channel, "count": len(endpoints)})
+
+    def drain(self):
+        """Roda lotes até a fila do canal esvaziar (job do worker)."""
+        db = SessionLocal()
+        try:
+            while sum(self.run_once(db).values()) >= settings.NOTIFY_BATCH_SIZE:
+                pass
+        except Exception as e:
+            logger.error({"event": "notify_error", "channel": self.channel, "error": str(e)})
+        finally:
+            db.close()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+def dispatchers() -> List[OutboxDispatcher]:
+    return [OutboxDispatcher(channel) for channel in settings.NOTIFY_CHANNELS]
+
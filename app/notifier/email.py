@@ -1,8 +1,157 @@
+"""Envio de e-mail por um pool de conexões SMTP.
+
+Abrir conexão, STARTTLS e login custam vários round-trips; com centenas de
+watchers no mesmo produto isso dominava o tempo de envio. As conexões ficam
+abertas e autenticadas no pool e são reaproveitadas entre mensagens (até
+SMTP_MAX_MESSAGES_PER_CONN ou SMTP_IDLE_SECONDS parada). Se o servidor
+derruba a sessão, a mensagem é reenviada numa conexão nova.
+
+Com SMTP_STARTTLS=true (padrão) a conexão falha se o servidor não oferecer
+STARTTLS. Só desligue (SMTP_STARTTLS=false, SMTP_USER vazio) para um servidor
+local de teste (ex.: `python -m aiosmtpd -n -l localhost:8025`).
+"""
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
+from queue import Empty, LifoQueue
+from typing import Optional
+
 from ..core.settings import settings
 from ..core.logger import logger
 
+STATS_EVERY = 100  # loga msgs/s a cada N enviadas
+
+
+class _Connection:
+    def __init__(self):
+        self.smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
+        self.smtp.ehlo()
+        if settings.SMTP_STARTTLS:
+            # sem o anúncio de STARTTLS (servidor mal configurado ou downgrade)
+            # starttls() levanta: a senha nunca vai em texto puro
+            self.smtp.starttls()
+            self.smtp.ehlo()
+        if settings.SMTP_USER:
+            self.smtp.login(settings.SMTP_USER, settings.SMTP_PASS)
+        self.sent = 0
+        self.used_at = time.monotonic()
+
+    def stale(self) -> bool:
+        return (self.sent >= settings.SMTP_MAX_MESSAGES_PER_CONN
+                or time.monotonic() - self.used_at > settings.SMTP_IDLE_SECONDS)
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+class SMTPPool:
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or settings.SMTP_POOL_SIZE
+        self._idle: LifoQueue = LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.connects = 0
+        self._started = time.monotonic()
+
+    def _acquire(self, fresh: bool = False) -> _Connection:
+        while not fresh:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            if not conn.stale():
+                return conn
+            conn.close()
+        with self._lock:
+            self.connects += 1
+        return _Connection()
+
+    def _release(self, conn: _Connection):
+        conn.used_at = time.monotonic()
+        if conn.stale():
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def send(self, from_addr: str, to_addrs: list, message: str):
+        """Envia numa conexão do pool; tenta uma vez mais numa conexão nova
+        se a sessão caiu."""
+        with self._slots:
+            for attempt in range(2):
+                conn = None
+                try:
+                    # na nova tentativa não confia nas ociosas: podem ter caído juntas
+                    conn = self._acquire(fresh=attempt > 0)
+                    conn.smtp.sendmail(from_addr, to_addrs, message)
+                except smtplib.SMTPRecipientsRefused:
+                    # recusa do destinatário não se resolve reconectando; a sessão segue boa
+                    self._release(conn)
+                    self._count(failed=1)
+                    raise
+                except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError):
+                    if conn is not None:
+                        conn.smtp.close()
+                    if attempt:
+                        self._count(failed=1)
+                        raise
+                    continue
+                conn.sent += 1
+                self._release(conn)
+                self._count(sent=1)
+                return
+
+    def _count(self, sent: int = 0, failed: int = 0):
+        with self._lock:
+            self.sent += sent
+            self.failed += failed
+            report = sent and self.sent % STATS_EVERY == 0
+        if report:
+            logger.info(self.stats())
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self._started
+        return {
+            "event": "smtp_pool",
+            "sent": self.sent,
+            "failed": self.failed,
+            "connections": self.connects,
+            "msgs_per_s": round(self.sent / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+_pool: Optional[SMTPPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SMTPPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool()
+        return _pool
+
+
+def close():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            logger.info(_pool.stats())
+            _pool.close()
+            _pool = None
+
 
 def send_email(to_email: str, subject: str, html: str):
     msg = MIMEText(html, "html", "utf-8")
@@ -10,8 +159,5 @@ def send_email(to_email: str, subject: str, html: str):
     msg["From"] = settings.SMTP_FROM
     msg["To"] = to_email
 
-    with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-        server.starttls()
-        server.login(settings.SMTP_USER, settings.SMTP_PASS)
-        server.sendmail(settings.SMTP_FROM, [to_email], msg.as_string())
+    get_pool().send(settings.SMTP_FROM, [to_email], msg.as_string())
     logger.info({"event": "email_sent", "to": to_email, "subject": subject})
@@ -0,0 +1,35 @@
+"""Outbox de notificações: o que o scraper grava quando um watch dispara."""
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+
+def outbox_rows(product, price: float, last_price: Optional[float], fired: List[Tuple[object, str]]) -> List[dict]:
+    """Linhas de `notification_outbox` para os watches disparados.
+
+    `product` é o `ProductSnapshot` do lote (título e URL vão no payload para
+    o dispatcher não precisar reler o produto).
+    """
+    now = datetime.utcnow()
+    rows = []
+    for watch, reason in fired:
+        payload = {
+            "product_id": watch.product_id,
+            "title": product.title if product else None,
+            "url": product.url if product else None,
+            "price": price,
+            "last_price": last_price,
+            "reason": reason,
+        }
+        rows.append({
+            "watch_id": watch.id,
+            "product_id": watch.product_id,
+            "channel": watch.channel,
+            "endpoint": watch.endpoint,
+            "payload": json.dumps(payload, ensure_ascii=False),
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        })
+    return rows
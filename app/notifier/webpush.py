@@ -1,16 +1,141 @@
-from pywebpush import webpush, WebPushException
+"""Envio de Web Push assíncrono e em lote.
+
+- o token VAPID (JWT assinado) é gerado uma vez por origem do serviço de
+  push e reaproveitado até perto de expirar (WEBPUSH_VAPID_TTL);
+- a criptografia do payload (aes128gcm) roda num pool de threads;
+- os envios saem por um `httpx.AsyncClient` (HTTP/2 quando disponível) no
+  loop compartilhado do scraper, com no máximo WEBPUSH_CONCURRENCY ao mesmo
+  tempo;
+- 404/410 significam inscrição expirada: `SubscriptionExpired`, e o
+  dispatcher desativa o watch.
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from py_vapid import Vapid
+from pywebpush import WebPusher, WebPushException
+
 from ..core.settings import settings
 from ..core.logger import logger
+from ..scraper.http import run_sync
 
 
-def send_webpush(subscription_info: dict, payload: dict):
+class SubscriptionExpired(WebPushException):
+    """O serviço de push respondeu 404/410: a inscrição não existe mais."""
+
+
+class WebPushSender:
+    def __init__(self):
+        self._vapid: Optional[Vapid] = None
+        self._tokens: Dict[str, Tuple[dict, float]] = {}  # origem -> (headers, expira em)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._crypto = ThreadPoolExecutor(max_workers=settings.WEBPUSH_CRYPTO_WORKERS,
+                                          thread_name_prefix="webpush-crypto")
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def vapid_headers(self, endpoint: str) -> dict:
+        """Authorization VAPID da origem do endpoint, do cache se ainda vale."""
+        url = urlparse(endpoint)
+        origin = f"{url.scheme}://{url.netloc}"
+        now = time.time()
+        cached = self._tokens.get(origin)
+        if cached and cached[1] - now > 60:
+            return cached[0]
+        if self._vapid is None:
+            key = settings.VAPID_PRIVATE_KEY
+            self._vapid = Vapid.from_file(key) if os.path.isfile(key) else Vapid.from_string(private_key=key)
+        exp = int(now) + settings.WEBPUSH_VAPID_TTL
+        headers = self._vapid.sign({"sub": settings.VAPID_CLAIMS_SUB, "aud": origin, "exp": exp})
+        self._tokens[origin] = (headers, exp)
+        return headers
+
+    def _client_for_loop(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=settings.HTTP_HTTP2 and importlib.util.find_spec("h2") is not None,
+                timeout=settings.WEBPUSH_TIMEOUT,
+                limits=httpx.Limits(max_connections=settings.WEBPUSH_CONCURRENCY),
+            )
+            self._slots = asyncio.Semaphore(settings.WEBPUSH_CONCURRENCY)
+        return self._client
+
+    @staticmethod
+    def _encrypt(subscription: dict, data: bytes) -> bytes:
+        return WebPusher(subscription).encode(data, "aes128gcm")["body"]
+
+    async def send(self, subscription: dict, payload: dict):
+        client = self._client_for_loop()
+        endpoint = subscription["endpoint"]
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(self._crypto, self._encrypt, subscription, data)
+        headers = {
+            **self.vapid_headers(endpoint),
+            "Content-Encoding": "aes128gcm",
+            "Content-Type": "application/octet-stream",
+            "TTL": str(settings.WEBPUSH_MESSAGE_TTL),
+        }
+        async with self._slots:
+            resp = await client.post(endpoint, content=body, headers=headers)
+        if resp.status_code in (404, 410):
+            raise SubscriptionExpired(f"inscrição expirada ({resp.status_code})", response=resp)
+        if resp.status_code > 202:
+            raise WebPushException(f"Push failed: {resp.status_code} {resp.text[:200]}", response=resp)
+
+    async def send_many(self, messages: List[Tuple[dict, dict]]) -> List[Optional[Exception]]:
+        """Envia (inscrição, payload) em paralelo; devolve o erro de cada um."""
+        results = await asyncio.gather(*(self.send(s, p) for s, p in messages), return_exceptions=True)
+        return [r if isinstance(r, Exception) else None for r in results]
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_sender: Optional[WebPushSender] = None
+
+
+def get_sender() -> WebPushSender:
+    global _sender
+    if _sender is None:
+        _sender = WebPushSender()
+    return _sender
+
+
+def subscription_of(endpoint: str) -> dict:
+    """O `endpoint` do watch guarda a inscrição (JSON) ou só a URL."""
     try:
-        webpush(
-            subscription_info=subscription_info,
-            data=str(payload),
-            vapid_private_key=settings.VAPID_PRIVATE_KEY,
-            vapid_claims={"sub": settings.VAPID_CLAIMS_SUB},
-        )
-        logger.info({"event": "webpush_sent"})
-    except WebPushException as ex:
-        logger.error({"event": "webpush_error", "error": str(ex)})
+        return json.loads(endpoint)
+    except ValueError:
+        return {"endpoint": endpoint}
+
+
+def send_webpush_many(messages: List[Tuple[dict, dict]]) -> List[Optional[Exception]]:
+    errors = run_sync(get_sender().send_many(messages))
+    sent = sum(e is None for e in errors)
+    expired = sum(isinstance(e, SubscriptionExpired) for e in errors)
+    logger.info({"event": "webpush_sent", "sent": sent, "expired": expired, "failed": len(errors) - sent - expired})
+    return errors
+
+
+def send_webpush(subscription_info: dict, payload: dict):
+    error = send_webpush_many([(subscription_info, payload)])[0]
+    if error is not None:
+        logger.error({"event": "webpush_error", "error": str(error)})
+        raise error
+
+
+def close():
+    global _sender
+    if _sender is not None:
+        run_sync(_sender.aclose())
+        _sender._crypto.shutdown()
+        _sender = None
@@ -1,23 +1,33 @@
 from .base import BaseAdapter, ScrapeResult
-from bs4 import BeautifulSoup
+from lxml import etree
+
+TITLE = etree.XPath('(//h1)[1]')
+OG_TITLE = etree.XPath('string((//*[@property="og:title"])[1]/@content)')
+PRICE = etree.XPath('(//*[@data-testid="price-value"])[1] | (//meta[@itemprop="price"])[1]')
+OUT_OF_STOCK = etree.XPath(
+    'boolean(//text()[contains(translate(., "ABCDEFGHIJKLMNOPQRSTUVWXYZÍ", "abcdefghijklmnopqrstuvwxyzí"), "indisponível")'
+    ' or contains(translate(., "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"), "esgotado")])'
+)
 
 class AmericanasAdapter(BaseAdapter):
-    def parse(self, html: str) -> ScrapeResult:
-        soup = BeautifulSoup(html, "lxml")
+    raw_bytes = True
+
+    def parse(self, html) -> ScrapeResult:
+        doc = self.parse_tree(html)
         title = None
-        t = soup.select_one("h1") or soup.select_one('[property="og:title"]')
+        t = TITLE(doc)
         if t:
-            title = t.get_text(strip=True) if hasattr(t, 'get_text') else t.get('content')
+            title = self.node_text(t[0])
+        if not title:
+            title = OG_TITLE(doc) or None
 
         price = None
-        p = soup.select_one("[data-testid='price-value']") or soup.select_one("meta[itemprop='price']")
-        if p:
-            text = p.get("content") if p.has_attr("content") else p.get_text(" ", strip=True)
+        nodes = PRICE(doc)
+        p = next((n for n in nodes if n.get("data-testid") == "price-value"), nodes[0] if nodes else None)
+        if p is not None:
+            text = p.get("content") if p.get("content") is not None else self.node_text(p, " ")
             price = self.parse_price_brl(text)
 
-        in_stock = True
-        oos = soup.find(text=lambda x: x and ("indisponível" in x.lower() or "esgotado" in x.lower()))
-        if oos:
-            in_stock = False
+        in_stock = not OUT_OF_STOCK(doc)
 
         return ScrapeResult(title=title, price=price, in_stock=in_stock)
@@ -1,19 +1,41 @@
 from dataclasses import dataclass
 from typing import Optional
-from bs4 import BeautifulSoup
+from lxml import etree
 import re
 
+# bytes chegam aqui só quando a página é UTF-8 (`parsing.parse_page` decodifica
+# as outras antes); str é reencodada em UTF-8
+_HTML_PARSER = etree.HTMLParser(encoding="utf-8", remove_comments=True)
+
 @dataclass
 class ScrapeResult:
     title: Optional[str]
     price: Optional[float]
     in_stock: Optional[bool]
+    strategy: Optional[str] = None  # como o preço foi extraído (ex.: "fast_path", "dom")
 
 class BaseAdapter:
+    # True quando o adapter prefere receber o corpo cru (bytes) da resposta
+    raw_bytes = False
+
     def parse(self, html: str) -> ScrapeResult:
         """Implementar no adapter específico."""
         raise NotImplementedError
 
+    @staticmethod
+    def parse_tree(html):
+        """Árvore lxml a partir de bytes ou str."""
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+        doc = etree.fromstring(html, _HTML_PARSER) if html.strip() else None
+        # documento vazio/ilegível: árvore vazia em vez de None
+        return doc if doc is not None else etree.fromstring(b"<html></html>", _HTML_PARSER)
+
+    @staticmethod
+    def node_text(node, separator: str = "") -> str:
+        """Equivalente ao get_text(separator, strip=True) do BeautifulSoup."""
+        return separator.join(s.strip() for s in node.itertext() if s.strip())
+
     # Utilitário básico para BRL: extrai 1234.56 de strings tipo "R$ 1.234,56"
     def parse_price_brl(self, text: str) -> Optional[float]:
         if not text:
@@ -1,9 +1,44 @@
 from .base import BaseAdapter, ScrapeResult
 from bs4 import BeautifulSoup
+from html import unescape
+import json
 import re
 
+# Varredura do HTML cru (sem montar DOM) para o caminho rápido
+_JSONLD_RE = re.compile(r"<script\b[^>]*type\s*=\s*[\"']application/ld\+json[\"'][^>]*>(.*?)</script\s*>", re.I | re.S)
+_META_RE = re.compile(r"<meta\b[^>]*>", re.I)
+_ATTR_RE = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_TITLE_RE = re.compile(r"<title\b[^>]*>(.*?)</title\s*>", re.I | re.S)
+_H1_RE = re.compile(r"<h1\b[^>]*>(.*?)</h1\s*>", re.I | re.S)
+# o que o get_text() do BeautifulSoup ignora: comentários, script e style
+_HIDDEN_RE = re.compile(r"<!--.*?-->|<(script|style|template)\b.*?</\1\s*>", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+OUT_OF_STOCK_TEXTS = [
+    "indisponível", "fora de estoque", "sem estoque", "esgotado",
+    "produto indisponível", "temporariamente indisponível",
+    "out of stock", "unavailable"
+]
+
+
+def _meta_tags(html):
+    """Atributos de cada <meta> como dict (nomes em minúsculas)."""
+    for tag in _META_RE.finditer(html):
+        yield {m.group(1).lower(): unescape(m.group(2) if m.group(2) is not None else m.group(3))
+               for m in _ATTR_RE.finditer(tag.group(0))}
+
+
+def _visible_text(html):
+    return unescape(_TAG_RE.sub(" ", _HIDDEN_RE.sub(" ", html)))
+
+
 class FallbackAdapter(BaseAdapter):
     def parse(self, html: str) -> ScrapeResult:
+        # Caminho rápido: JSON-LD e meta de preço direto no HTML cru
+        result = self._parse_fast(html)
+        if result is not None:
+            return result
+
         soup = BeautifulSoup(html, "lxml")
         
         # Tentar capturar título
@@ -15,8 +50,48 @@ class FallbackAdapter(BaseAdapter):
         # Verificar se está em estoque
         in_stock = self._check_stock(soup)
         
-        return ScrapeResult(title=title, price=price, in_stock=in_stock)
-    
+        return ScrapeResult(title=title, price=price, in_stock=in_stock, strategy="dom")
+
+    def _parse_fast(self, html):
+        """Extrai sem BeautifulSoup; None quando o preço não está em JSON-LD/meta."""
+        metas = None
+        price = None
+        for block in _JSONLD_RE.findall(html):
+            try:
+                price = self._price_from_jsonld(json.loads(block))
+            except Exception:
+                continue
+            if price:
+                break
+        if not price:
+            metas = list(_meta_tags(html))
+            for attrs in metas:
+                if attrs.get("property") == "product:price:amount" and attrs.get("content"):
+                    price = self.parse_price_brl(attrs["content"])
+                    break
+        if not price:
+            return None
+
+        if metas is None:
+            metas = list(_meta_tags(html))
+        title = None
+        for attrs in metas:
+            if attrs.get("property") == "og:title" and attrs.get("content"):
+                title = attrs["content"].strip()
+                break
+        if not title:
+            for regex in (_TITLE_RE, _H1_RE):
+                m = regex.search(html)
+                text = _visible_text(m.group(1)).strip() if m else ""
+                if text:
+                    title = text
+                    break
+
+        text = _visible_text(html).lower()
+        in_stock = not any(oos_text in text for oos_text in OUT_OF_STOCK_TEXTS)
+
+        return ScrapeResult(title=title, price=price, in_stock=in_stock, strategy="fast_path")
+
     def _extract_title(self, soup):
         """Tenta extrair título de várias formas"""
         # OpenGraph
@@ -89,54 +164,52 @@ class FallbackAdapter(BaseAdapter):
         """Extrai preço de dados estruturados JSON-LD"""
         for script in soup.select("script[type='application/ld+json']"):
             try:
-                import json
-                data = json.loads(script.text)
-                
-                # Normalizar para lista
-                if isinstance(data, dict):
-                    data = [data]
-                elif not isinstance(data, list):
-                    continue
-                
-                for item in data:
-                    if not isinstance(item, dict):
-                        continue
-                    
-                    # Buscar offers
-                    offers = item.get("offers")
-                    if offers:
-                        if isinstance(offers, dict):
-                            price_value = offers.get("price") or offers.get("lowPrice")
-                            if price_value:
-                                return self.parse_price_brl(str(price_value))
-                        elif isinstance(offers, list):
-                            for offer in offers:
-                                if isinstance(offer, dict):
-                                    price_value = offer.get("price") or offer.get("lowPrice")
-                                    if price_value:
-                                        return self.parse_price_brl(str(price_value))
-                    
-                    # Buscar price diretamente
-                    price_value = item.get("price")
+                price = self._price_from_jsonld(json.loads(script.text))
+            except Exception:
+                continue
+            if price:
+                return price
+
+        return None
+
+    def _price_from_jsonld(self, data):
+        """Procura offers.price/lowPrice ou price num bloco JSON-LD já decodificado"""
+        # Normalizar para lista
+        if isinstance(data, dict):
+            data = [data]
+        elif not isinstance(data, list):
+            return None
+
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+
+            # Buscar offers
+            offers = item.get("offers")
+            if offers:
+                if isinstance(offers, dict):
+                    price_value = offers.get("price") or offers.get("lowPrice")
                     if price_value:
                         return self.parse_price_brl(str(price_value))
-                        
-            except (json.JSONDecodeError, Exception):
-                continue
-        
+                elif isinstance(offers, list):
+                    for offer in offers:
+                        if isinstance(offer, dict):
+                            price_value = offer.get("price") or offer.get("lowPrice")
+                            if price_value:
+                                return self.parse_price_brl(str(price_value))
+
+            # Buscar price diretamente
+            price_value = item.get("price")
+            if price_value:
+                return self.parse_price_brl(str(price_value))
+
         return None
-    
+
     def _check_stock(self, soup):
         """Verifica se o produto está em estoque"""
         # Textos que indicam falta de estoque
-        out_of_stock_texts = [
-            "indisponível", "fora de estoque", "sem estoque", "esgotado",
-            "produto indisponível", "temporariamente indisponível",
-            "out of stock", "unavailable"
-        ]
-        
         text = soup.get_text().lower()
-        for oos_text in out_of_stock_texts:
+        for oos_text in OUT_OF_STOCK_TEXTS:
             if oos_text in text:
                 return False
         
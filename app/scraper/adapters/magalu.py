@@ -1,23 +1,37 @@
 from .base import BaseAdapter, ScrapeResult
-from bs4 import BeautifulSoup
+from lxml import etree
+
+# XPaths pré-compilados: nada de montar a árvore do BeautifulSoup nem
+# visitar cada nó de texto em Python
+TITLE = etree.XPath('(//h1)[1] | (//*[@itemprop="name"])[1]')
+PRICE = etree.XPath(
+    '(//*[@data-testid="price-value"])[1]'
+    ' | (//*[contains(concat(" ", normalize-space(@class), " "), " price__buy-box ")]'
+    '//*[contains(concat(" ", normalize-space(@class), " "), " price-template__text ")])[1]'
+)
+OUT_OF_STOCK = etree.XPath(
+    'boolean(//text()[contains(translate(., "ABCDEFGHIJKLMNOPQRSTUVWXYZÍ", "abcdefghijklmnopqrstuvwxyzí"), "indisponível")])'
+)
 
 class MagaluAdapter(BaseAdapter):
-    def parse(self, html: str) -> ScrapeResult:
-        soup = BeautifulSoup(html, "lxml")
+    raw_bytes = True
+
+    def parse(self, html) -> ScrapeResult:
+        doc = self.parse_tree(html)
         # seletores simples (ajustar com HTML real)
         title = None
-        t = soup.select_one("h1") or soup.select_one('[itemprop="name"]')
-        if t:
-            title = t.get_text(strip=True)
+        nodes = TITLE(doc)
+        # h1 tem prioridade sobre itemprop=name, como no seletor original
+        t = next((n for n in nodes if n.tag == "h1"), nodes[0] if nodes else None)
+        if t is not None:
+            title = self.node_text(t)
 
         price = None
-        p = soup.select_one("[data-testid='price-value']") or soup.select_one(".price__buy-box .price-template__text")
-        if p:
-            price = self.parse_price_brl(p.get_text(" ", strip=True))
+        nodes = PRICE(doc)
+        p = next((n for n in nodes if n.get("data-testid") == "price-value"), nodes[0] if nodes else None)
+        if p is not None:
+            price = self.parse_price_brl(self.node_text(p, " "))
 
-        in_stock = True
-        oos = soup.find(text=lambda x: x and "indisponível" in x.lower())
-        if oos:
-            in_stock = False
+        in_stock = not OUT_OF_STOCK(doc)
 
         return ScrapeResult(title=title, price=price, in_stock=in_stock)
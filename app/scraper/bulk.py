@@ -0,0 +1,60 @@
+"""Checagem de vários produtos a pedido da API, com resultados em fluxo.
+
+Usa o mesmo `ScrapeEngine` do worker (parse no pool de processos e
+gravação em lote) no loop do scraper. As vagas de fetch (total e por
+domínio) e o limitador de taxa são os do processo da API, divididos entre
+chamadas simultâneas, /scrape-now e /track (ver `http`). Cada produto vira um dict depois que
+o lote dele é gravado (um produto cujo lote falhou sai como "failed");
+`scrape_many` repassa esses dicts ao event loop da API na ordem em que
+terminam, e por último um resumo do ciclo.
+"""
+import asyncio
+from typing import AsyncIterator, List, Optional
+
+from ..core.db import SessionLocal
+from ..core.logger import logger
+from ..models.product import Product
+from .engine import ScrapeEngine
+from .http import get_loop
+
+
+def load_products(db, product_ids: Optional[List[int]], domain: Optional[str], limit: int) -> List[Product]:
+    q = db.query(Product)
+    if product_ids:
+        q = q.filter(Product.id.in_(product_ids))
+    if domain:
+        q = q.filter(Product.domain == domain.replace("www.", ""))
+    return q.order_by(Product.id).limit(limit).all()
+
+
+async def scrape_many(product_ids: Optional[List[int]], domain: Optional[str], limit: int) -> AsyncIterator[dict]:
+    """Checa os produtos e devolve um dict por produto à medida que terminam."""
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+    db = SessionLocal()
+    products = await loop.run_in_executor(None, load_products, db, product_ids, domain, limit)
+    if not products:
+        db.close()
+        yield {"event": "summary", "products": 0}
+        return
+
+    def report(item: dict):
+        # chamado no loop do scraper; entrega no loop desta requisição
+        loop.call_soon_threadsafe(results.put_nowait, item)
+
+    cycle = asyncio.run_coroutine_threadsafe(ScrapeEngine().run(db, products, on_result=report), get_loop())
+    # o ciclo segue até o fim mesmo se o cliente desconectar; a Session só fecha depois
+    cycle.add_done_callback(lambda _: db.close())
+    cycle.add_done_callback(lambda _: loop.call_soon_threadsafe(results.put_nowait, None))
+    while True:
+        item = await results.get()
+        if item is None:
+            break
+        yield {"event": "product", **item}
+    try:
+        stats = cycle.result()
+    except Exception as e:
+        logger.error({"event": "bulk_scrape_error", "error": str(e)})
+        yield {"event": "error", "error": str(e)}
+        return
+    yield {"event": "summary", **{k: v for k, v in stats.as_log().items() if k != "event"}}
@@ -0,0 +1,344 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, zip_longest
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .adapters.base import ScrapeResult
+from .http import FetchLimits, fetch, fetch_limits
+from .parsing import parse_page
+from .persist import BatchWriter, ProductSnapshot
+from .runner import conditional_headers, domain_of, fetch_state_row, known_hash, log_failure, reuse_result
+from ..models.product import Product
+from ..models.fetch_state import FetchState
+from ..core.settings import settings
+from ..core.logger import logger
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def parse_workers() -> int:
+    if settings.PARSE_WORKERS is not None:
+        return settings.PARSE_WORKERS
+    return os.cpu_count() or 1
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Pool de processos do parse, reaproveitado entre ciclos (None = inline)."""
+    global _parse_pool
+    if parse_workers() <= 0:
+        return None
+    if _parse_pool is None:
+        # spawn: o processo do worker já tem threads (scheduler, loop HTTP)
+        _parse_pool = ProcessPoolExecutor(max_workers=parse_workers(), mp_context=multiprocessing.get_context("spawn"))
+    return _parse_pool
+
+
+def shutdown_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool = None
+
+
+@dataclass
+class CycleStats:
+    total: int = 0
+    updated: int = 0
+    failed: int = 0
+    not_modified: int = 0
+    unchanged: int = 0
+    parsed: int = 0
+    fast_path: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Produtos por segundo no ciclo."""
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fração das checagens respondidas com 304 (sem download nem parse)."""
+        return self.not_modified / self.total if self.total else 0.0
+
+    def as_log(self) -> dict:
+        return {
+            "event": "scrape_cycle",
+            "products": self.total,
+            "updated": self.updated,
+            "failed": self.failed,
+            "not_modified": self.not_modified,
+            "cache_hit_rate": round(self.hit_rate, 3),
+            "unchanged": self.unchanged,
+            "parsed": self.parsed,
+            "fast_path_hits": self.fast_path,
+            "bytes": self.bytes,
+            "elapsed_s": round(self.elapsed, 2),
+            "products_per_s": round(self.rate, 2),
+        }
+
+
+@dataclass
+class Job:
+    """Um produto atravessando o pipeline.
+
+    Só carrega valores simples, lidos antes do ciclo: nenhuma etapa toca
+    objetos ORM (que expiram a cada commit do lote).
+    """
+    product: ProductSnapshot
+    url: str
+    domain: str
+    headers: dict
+    known_hash: Optional[str]
+    cached: Optional[ScrapeResult] = None  # resultado anterior, se o hash bater
+    resp: object = None
+    digest: Optional[str] = None
+    result: Optional[ScrapeResult] = None
+    error: Optional[Exception] = None
+
+
+class _FetchSlot:
+    """Slot que o engine passa a `fetch`.
+
+    A vaga global (SCRAPE_CONCURRENCY) é segurada só durante cada requisição.
+    A vaga do buffer vai da primeira requisição até a página entrar na fila
+    do parse: é ela que faz o backpressure (parse lento = nada de downloads
+    novos), sem prender quem ainda espera o domínio.
+    """
+
+    def __init__(self, global_slots: asyncio.Semaphore, buffer: asyncio.Semaphore):
+        self._global = global_slots
+        self._buffer = buffer
+        self._buffered = False
+
+    async def __aenter__(self):
+        if not self._buffered:
+            await self._buffer.acquire()
+            self._buffered = True
+        await self._global.acquire()
+
+    async def __aexit__(self, *exc):
+        self._global.release()
+
+    def release(self):
+        if self._buffered:
+            self._buffer.release()
+            self._buffered = False
+
+
+def interleave_by_domain(jobs: List[Job]) -> List[Job]:
+    """Alterna domínios na fila para um varejista lento não ocupar todos os fetchers."""
+    by_domain = defaultdict(list)
+    for job in jobs:
+        by_domain[job.domain].append(job)
+    return [j for j in chain.from_iterable(zip_longest(*by_domain.values())) if j is not None]
+
+
+class ScrapeEngine:
+    """Ciclo de scraping em pipeline: fetch → parse → gravação.
+
+    - fetch: corrotinas no loop do scraper (`http.run_sync`), com limite
+      global (número de fetchers) e por domínio, por padrão os do processo
+      (`http.fetch_limits`);
+    - parse: `parse_page` num `ProcessPoolExecutor`, usando todos os núcleos
+      (BeautifulSoup/lxml seguram o GIL);
+    - gravação: uma única thread dona da Session, em lotes (`BatchWriter`).
+
+    Filas limitadas entre as etapas fazem o backpressure: se o parse ou o
+    banco atrasam, os fetchers param de baixar páginas.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, per_domain: Optional[int] = None):
+        # sem limites próprios usa as vagas do processo (`http.fetch_limits`),
+        # divididas com as outras checagens em andamento (bulk, /track, ...)
+        self.limits = FetchLimits(concurrency, per_domain) if concurrency or per_domain else fetch_limits
+
+    async def _fetch_one(self, job: Job, parse_q: asyncio.Queue, stats: CycleStats):
+        """Baixa um produto. A espera pelo domínio (semáforo, limitador,
+        backoff de 429/503) não ocupa vaga global: `fetch` só segura o slot
+        durante a requisição, então um domínio travado não para os outros."""
+        slot = _FetchSlot(self.limits.global_slots, self._buffer)
+        try:
+            async with self.limits.domain(job.domain):
+                job.resp = await fetch(job.url, job.headers, slot=slot)
+            stats.bytes += len(job.resp.content)
+        except Exception as e:
+            job.error = e
+        try:
+            await parse_q.put(job)
+        finally:
+            slot.release()
+
+    async def _parse_stage(self, parse_q: asyncio.Queue, persist_q: asyncio.Queue, pool, stats: CycleStats):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await parse_q.get()
+            if job is None:
+                break
+            if job.error is None and job.resp.status_code != 304:
+                try:
+                    args = (job.domain, job.resp.content, job.resp.charset_encoding, job.known_hash)
+                    if pool is not None:
+                        job.digest, job.result = await loop.run_in_executor(pool, parse_page, *args)
+                    else:
+                        job.digest, job.result = parse_page(*args)
+                    if job.result is None:
+                        stats.unchanged += 1
+                    else:
+                        stats.parsed += 1
+                        if job.result.strategy == "fast_path":
+                            stats.fast_path += 1
+                except Exception as e:
+                    job.error = e
+            await persist_q.put(job)
+
+    @staticmethod
+    def _persist(writer: BatchWriter, job: Optional[Job]) -> str:
+        # roda sempre na mesma thread: a Session nunca é usada em paralelo
+        if job is None:
+            writer.flush()
+            return "flushed"
+        if job.error is not None:
+            log_failure(job.product.id, job.error)
+            # Ainda assim atualizar last_checked_at para evitar tentativas infinitas
+            writer.add_checked(job.product.id)
+            return "failed"
+        if job.resp.status_code == 304:
+            # mesmo efeito de um hash igual: reaproveita o último resultado
+            if job.cached is not None:
+                writer.add_result(job.product, job.cached)
+            else:
+                writer.add_checked(job.product.id)
+            return "not_modified"
+        result = job.result if job.result is not None else job.cached
+        state = fetch_state_row(job.product.id, job.resp, result, job.digest)
+        return "updated" if writer.add_result(job.product, result, state) else "saved"
+
+    @staticmethod
+    def report(job: Job, outcome: str) -> dict:
+        """Resumo de um produto cujo lote já foi gravado (ou falhou)."""
+        result = job.result if job.result is not None else job.cached
+        return {
+            "product_id": job.product.id,
+            "status": outcome,  # updated | saved | not_modified | failed
+            "price": result.price if result is not None and job.error is None else None,
+            "title": result.title if result is not None and job.error is None else None,
+            "error": str(job.error) if job.error is not None else None,
+        }
+
+    def _settle(self, writer: BatchWriter, pending: List[tuple], stats: CycleStats):
+        """Conta e publica os produtos do lote assim que ele sai do BatchWriter:
+        antes do flush o resultado ainda pode virar falha (`writer.failed`)."""
+        if writer.pending:
+            return
+        for job, outcome in pending:
+            if job.product.id in writer.failed:
+                outcome = "failed"
+                job.error = job.error or RuntimeError("falha ao gravar o lote")
+            if outcome == "updated":
+                stats.updated += 1
+            elif outcome == "not_modified":
+                stats.not_modified += 1
+            elif outcome == "failed":
+                stats.failed += 1
+            if self._on_result is not None:
+                try:
+                    self._on_result(self.report(job, outcome))
+                except Exception as e:
+                    logger.error({"event": "on_result_error", "error": str(e)})
+        pending.clear()
+
+    async def _persist_stage(self, db: Session, persist_q: asyncio.Queue, stats: CycleStats):
+        loop = asyncio.get_running_loop()
+        writer = BatchWriter(db)
+        pending = []  # (job, outcome) ainda no lote do writer
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape-persist") as thread:
+            while True:
+                try:
+                    job = await asyncio.wait_for(persist_q.get(), timeout=writer.flush_seconds)
+                except asyncio.TimeoutError:
+                    # nada chegou em T segundos: não deixa o lote parado
+                    job = False
+                try:
+                    if job is False:
+                        await loop.run_in_executor(thread, writer.flush)
+                        outcome = None
+                    else:
+                        outcome = await loop.run_in_executor(thread, self._persist, writer, job)
+                except Exception as e:
+                    # um produto (ou um flush) com erro não derruba a etapa: os
+                    # parsers ficariam presos na fila cheia e o ciclo nunca acabaria
+                    logger.exception({"event": "persist_error", "product_id": job.product.id if job else None,
+                                      "error": str(e)})
+                    outcome = "flushed" if job is None else "failed" if job else None
+                if outcome not in (None, "flushed"):
+                    pending.append((job, outcome))
+                self._settle(writer, pending, stats)
+                if outcome == "flushed":
+                    break
+
+    async def _fetch_stage(self, jobs: List[Job], parse_q: asyncio.Queue, persist_q: asyncio.Queue,
+                           parse_tasks: List[asyncio.Task], stats: CycleStats):
+        """Baixa tudo (uma tarefa por produto) e encerra as etapas seguintes em ordem."""
+        await asyncio.gather(*(self._fetch_one(job, parse_q, stats) for job in jobs))
+        for _ in parse_tasks:
+            await parse_q.put(None)
+        await asyncio.gather(*parse_tasks)
+        await persist_q.put(None)
+
+    async def run(self, db: Session, products: Iterable[Product],
+                  on_result: Optional[Callable[[dict], None]] = None) -> CycleStats:
+        """Processa os produtos. `on_result`, se dado, recebe o `report` de
+        cada um depois do commit do lote dele (no loop do scraper)."""
+        products = list(products)
+        self._on_result = on_result
+        stats = CycleStats(total=len(products))
+        self._buffer = asyncio.Semaphore(self.limits.concurrency + settings.PIPELINE_QUEUE_SIZE)
+
+        ids = [p.id for p in products]
+        states = {s.product_id: s for s in db.query(FetchState).filter(FetchState.product_id.in_(ids))}
+        jobs = []
+        for p in products:
+            state = states.get(p.id)
+            digest = known_hash(state)
+            jobs.append(Job(product=ProductSnapshot.of(p), url=p.url, domain=domain_of(p.url),
+                            headers=conditional_headers(state), known_hash=digest,
+                            cached=reuse_result(state) if state is not None and state.price is not None else None))
+
+        pool = get_parse_pool()
+        parsers = parse_workers() if pool is not None else 1
+        parse_q = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+        persist_q = asyncio.Queue(maxsize=settings.PIPELINE_QUEUE_SIZE)
+
+        started = time.perf_counter()
+        persist_task = asyncio.create_task(self._persist_stage(db, persist_q, stats))
+        parse_tasks = [asyncio.create_task(self._parse_stage(parse_q, persist_q, pool, stats)) for _ in range(parsers)]
+        fetch_task = asyncio.create_task(
+            self._fetch_stage(interleave_by_domain(jobs), parse_q, persist_q, parse_tasks, stats))
+        await supervise([persist_task, *parse_tasks, fetch_task])
+        stats.elapsed = time.perf_counter() - started
+
+        logger.info(stats.as_log())
+        return stats
+
+
+async def supervise(tasks: List[asyncio.Task]):
+    """Espera as etapas do pipeline; se uma falha, cancela as outras e repassa
+    o erro (senão as demais ficariam presas em filas que ninguém mais esvazia)."""
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
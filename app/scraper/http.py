@@ -0,0 +1,164 @@
+"""Cliente HTTP compartilhado do scraper.
+
+Um único `httpx.AsyncClient` vive num event loop dedicado (thread daemon),
+assim worker, /scrape-now e /track reaproveitam as mesmas conexões
+keep-alive e o handshake TCP+TLS é pago uma vez por host.
+
+Limitador de taxa (`limiter`) e vagas de fetch (`fetch_limits`) também são
+um por processo: na API, /scrape-now, /track e as chamadas de bulk dividem o
+mesmo orçamento por domínio, por mais que rodem ao mesmo tempo. Worker e API
+são processos separados, cada um com o seu: juntos podem chegar ao dobro de
+RATE_LIMIT_*/SCRAPE_PER_DOMAIN num domínio (ajuste os limites da API se isso
+importar).
+"""
+import asyncio
+import contextlib
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from .ratelimit import DomainRateLimiter, parse_retry_after
+from ..core.settings import settings
+from ..core.logger import logger
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
+    "Accept-Language": "pt-BR,pt;q=0.9",
+}
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_client: Optional[httpx.AsyncClient] = None
+_host_slots = defaultdict(lambda: asyncio.Semaphore(settings.HTTP_MAX_PER_HOST))
+limiter = DomainRateLimiter()
+
+
+class FetchLimits:
+    """Vagas de fetch: no total (SCRAPE_CONCURRENCY) e por domínio
+    (SCRAPE_PER_DOMAIN). Os semáforos nascem no loop do scraper, no primeiro uso."""
+
+    def __init__(self, concurrency: Optional[int] = None, per_domain: Optional[int] = None):
+        self.concurrency = concurrency or settings.SCRAPE_CONCURRENCY
+        self.per_domain = per_domain or settings.SCRAPE_PER_DOMAIN
+        self._global: Optional[asyncio.Semaphore] = None
+        self._domains: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def global_slots(self) -> asyncio.Semaphore:
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.concurrency)
+        return self._global
+
+    def reset(self):
+        self._global = None
+        self._domains.clear()
+
+    def domain(self, domain: str) -> asyncio.Semaphore:
+        slots = self._domains.get(domain)
+        if slots is None:
+            slots = self._domains[domain] = asyncio.Semaphore(self.per_domain)
+        return slots
+
+
+# as do processo; ScrapeEngine com limites próprios cria as suas
+fetch_limits = FetchLimits()
+
+THROTTLE_STATUS = (429, 503)
+
+
+def domain_of(url: str) -> str:
+    return urlparse(url).netloc.replace("www.", "")
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="scraper-loop", daemon=True).start()
+    return _loop
+
+
+def run_sync(coro):
+    """Executa uma corrotina no loop do scraper e espera o resultado."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+def _http2_enabled() -> bool:
+    if not settings.HTTP_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP_HTTP2 ativo mas pacote h2 não instalado; usando HTTP/1.1")
+        return False
+    return True
+
+
+def get_client() -> httpx.AsyncClient:
+    """Cliente compartilhado. Só deve ser usado dentro do loop do scraper."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=settings.SCRAPE_TIMEOUT,
+            follow_redirects=True,
+            http2=_http2_enabled(),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+async def fetch(url: str, headers: Optional[dict] = None, slot=None) -> httpx.Response:
+    """GET pelo pool compartilhado, respeitando o limite do domínio.
+
+    304 (GET condicional) não é erro. Em 429/503 o domínio entra em backoff
+    (Retry-After ou exponencial) e a requisição é repetida algumas vezes.
+    `slot` é um context manager opcional segurado só durante a requisição,
+    nunca durante a espera do limitador ou da vaga do host.
+    """
+    domain = domain_of(url)
+    for attempt in range(settings.RATE_LIMIT_MAX_RETRIES + 1):
+        await limiter.acquire(domain)
+        # httpx não limita conexões por host; o semáforo faz esse papel. Ele
+        # vem antes do `slot`: a espera pelo host não segura vaga global
+        async with _host_slots[httpx.URL(url).host], slot or contextlib.nullcontext():
+            resp = await get_client().get(url, headers=headers)
+        if resp.status_code in THROTTLE_STATUS:
+            delay = limiter.penalize(domain, parse_retry_after(resp.headers.get("Retry-After")))
+            logger.warning({"event": "throttled", "domain": domain, "status": resp.status_code,
+                            "attempt": attempt + 1, "backoff_s": round(delay, 1)})
+            continue
+        limiter.succeed(domain)
+        break
+    if resp.status_code != 304:
+        resp.raise_for_status()
+    return resp
+
+
+async def fetch_limited(url: str, headers: Optional[dict] = None) -> httpx.Response:
+    """`fetch` dentro das vagas do processo (`fetch_limits`): a espera pelo
+    domínio não ocupa vaga global."""
+    async with fetch_limits.domain(domain_of(url)):
+        return await fetch(url, headers, slot=fetch_limits.global_slots)
+
+
+def close():
+    global _loop, _client
+    if _loop is None:
+        return
+    if _client is not None:
+        run_sync(_client.aclose())
+        _client = None
+    _loop.call_soon_threadsafe(_loop.stop)
+    _loop = None
+    _host_slots.clear()
+    fetch_limits.reset()
+    limiter.reset()
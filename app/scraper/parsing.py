@@ -0,0 +1,73 @@
+"""Etapa de parse do scraper.
+
+Só depende dos adapters (nada de banco/HTTP), para poder rodar em processos
+do `ProcessPoolExecutor` sem arrastar o resto da aplicação.
+"""
+import codecs
+import hashlib
+import re
+from typing import Optional, Tuple
+
+from .adapters.magalu import MagaluAdapter
+from .adapters.americanas import AmericanasAdapter
+from .adapters.fallback import FallbackAdapter
+from .adapters.base import ScrapeResult
+from ..core.settings import settings
+
+ADAPTERS = {
+    "magazineluiza.com.br": MagaluAdapter(),
+    "magalu.com": MagaluAdapter(),
+    "americanas.com.br": AmericanasAdapter(),
+}
+
+_VOLATILE_RE = re.compile(b"|".join(b"(?:%s)" % p.encode() for p in settings.CONTENT_HASH_STRIP_PATTERNS) or b"(?!)", re.S)
+
+# <meta charset="..."> ou <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([A-Za-z0-9_:.\-]+)", re.I)
+UTF8_COMPATIBLE = ("utf-8", "ascii")
+
+
+def pick_adapter(domain: str):
+    return ADAPTERS.get(domain) or FallbackAdapter()
+
+
+def content_hash(body: bytes) -> str:
+    """Hash do corpo sem trechos voláteis (nonces, tokens, timestamps)."""
+    return hashlib.blake2b(_VOLATILE_RE.sub(b"", body), digest_size=16).hexdigest()
+
+
+def page_encoding(body: bytes, declared: Optional[str] = None) -> str:
+    """Charset da página: o do Content-Type, senão o do <meta>, senão UTF-8."""
+    for candidate in (declared, _sniff_meta_charset(body)):
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                continue
+    return "utf-8"
+
+
+def _sniff_meta_charset(body: bytes) -> Optional[str]:
+    match = _META_CHARSET_RE.search(body[:4096])
+    return match.group(1).decode("ascii", errors="ignore") if match else None
+
+
+def parse_page(domain: str, body: bytes, encoding: Optional[str] = None,
+               known_hash: Optional[str] = None) -> Tuple[str, Optional[ScrapeResult]]:
+    """Hash + parse de uma página.
+
+    `encoding` é o charset declarado no Content-Type (None se não veio).
+    Retorna (hash, resultado). O resultado é None quando o hash bate com
+    `known_hash`, ou seja, o parse anterior ainda vale.
+    """
+    digest = content_hash(body)
+    if known_hash is not None and digest == known_hash:
+        return digest, None
+    adapter = pick_adapter(domain)
+    encoding = page_encoding(body, encoding)
+    if adapter.raw_bytes and encoding in UTF8_COMPATIBLE:
+        # caminho rápido: o libxml2 lê os bytes direto
+        html = body
+    else:
+        html = body.decode(encoding, errors="replace")
+    return digest, adapter.parse(html)
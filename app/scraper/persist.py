@@ -0,0 +1,315 @@
+"""Gravação em lote dos resultados do scraper.
+
+Em vez de um `db.commit()` (um fsync) por produto, os inserts em
+`price_history`, os agregados por hora/dia e os updates em
+`products`/`fetch_state` são acumulados e enviados em `executemany` a cada
+N produtos ou T segundos. Os triggers são avaliados dentro do lote e as
+notificações vão para a outbox no mesmo commit. Se um lote falha, ele é refeito produto a produto
+para que um registro ruim não derrube os outros.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, case, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from .adapters.base import ScrapeResult
+from .triggers import apply_triggers, debounce, rearm
+from ..models.product import VISIBLE_COLUMNS, Product
+from ..models.price_history import PriceHistory
+from ..models.price_rollup import ROLLUPS
+from ..models.fetch_state import FetchState
+from ..models.notification import Notification
+from ..models.watch_fire_state import WatchFireState
+from ..notifier.outbox import outbox_rows
+from ..core.cache import response_cache
+from ..core.settings import settings
+from ..core.logger import logger
+
+
+def upsert(db: Session, model, rows: List[dict], key: List[str], merge: Optional[Callable] = None):
+    """INSERT ... ON CONFLICT DO UPDATE em lote (SQLite e Postgres).
+
+    Por padrão a linha existente é sobrescrita; `merge(table, excluded)`
+    devolve outro SET para combinar os valores.
+    """
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(model.__table__)
+    if merge is not None:
+        set_ = merge(model.__table__.c, stmt.excluded)
+    else:
+        set_ = {c: stmt.excluded[c] for c in rows[0] if c not in key}
+    stmt = stmt.on_conflict_do_update(index_elements=key, set_=set_)
+    db.execute(stmt, rows)
+
+
+def _merge_rollup(t, new):
+    later = new.last_at >= t.last_at
+    return {
+        "min_price": case((new.min_price < t.min_price, new.min_price), else_=t.min_price),
+        "max_price": case((new.max_price > t.max_price, new.max_price), else_=t.max_price),
+        "sum_price": t.sum_price + new.sum_price,
+        "samples": t.samples + new.samples,
+        "last_price": case((later, new.last_price), else_=t.last_price),
+        "last_at": case((later, new.last_at), else_=t.last_at),
+    }
+
+
+def rollup_rows(model, points: Iterable[Tuple[int, float, datetime]]) -> List[dict]:
+    """Agrega (produto, preço, horário) nos intervalos de `model`.
+
+    Uma linha por (produto, intervalo): o mesmo lote não pode tocar duas
+    vezes a mesma linha num único upsert.
+    """
+    rows: Dict[tuple, dict] = {}
+    for product_id, price, at in points:
+        key = (product_id, model.truncate(at))
+        r = rows.get(key)
+        if r is None:
+            rows[key] = {"product_id": product_id, "bucket": key[1], "min_price": price, "max_price": price,
+                         "sum_price": price, "samples": 1, "last_price": price, "last_at": at}
+            continue
+        r["min_price"] = min(r["min_price"], price)
+        r["max_price"] = max(r["max_price"], price)
+        r["sum_price"] += price
+        r["samples"] += 1
+        if at >= r["last_at"]:
+            r["last_price"], r["last_at"] = price, at
+    return list(rows.values())
+
+
+def _product_update(columns):
+    """UPDATE que grava o preço novo e, no mesmo comando, o estado derivado.
+
+    Do lado direito do SET as colunas ainda têm o valor antigo, então
+    preço anterior/menor preço/data da mudança saem atômicos com o preço, e
+    `updated_at` só avança se algum campo visível mudou de fato. Ele recebe
+    `b_updated_at`, a hora da gravação do lote (não a da checagem, que pode
+    ser até um lote inteiro mais antiga).
+    """
+    t = Product.__table__
+    values = {c: bindparam(f"b_{c}") for c in columns}
+    visible = [c for c in columns if c in VISIBLE_COLUMNS]
+    changed = or_(*(or_(t.c[c].is_(None), t.c[c] != bindparam(f"b_{c}")) for c in visible))
+    values["updated_at"] = case((changed, bindparam("b_updated_at")), else_=t.c.updated_at)
+    if "current_price" in columns:
+        price = bindparam("b_current_price")
+        price_changed = or_(t.c.current_price.is_(None), t.c.current_price != price)
+        values.update(
+            previous_price=case((price_changed & t.c.current_price.isnot(None), t.c.current_price),
+                                else_=t.c.previous_price),
+            price_changed_at=case((price_changed, bindparam("b_last_checked_at")), else_=t.c.price_changed_at),
+            lowest_price=case((or_(t.c.lowest_price.is_(None), price < t.c.lowest_price), price),
+                              else_=t.c.lowest_price),
+        )
+    return update(t).where(t.c.id == bindparam("b_id")).values(values)
+
+
+def _extend_run():
+    """Estende a linha mais recente do histórico se ela tem o mesmo preço."""
+    t = PriceHistory.__table__
+    latest = (
+        select(t.c.id).where(t.c.product_id == bindparam("b_pid"))
+        .order_by(t.c.captured_at.desc()).limit(1).scalar_subquery()
+    )
+    return (
+        update(t).where(t.c.id == latest, t.c.price == bindparam("b_price"))
+        .values(last_seen_at=bindparam("b_seen"))
+    )
+
+
+@dataclass
+class ProductSnapshot:
+    """Campos do produto lidos antes do ciclo.
+
+    O lote grava via Core, sem depender dos objetos ORM (que expiram a cada
+    commit e custariam um SELECT por produto para serem relidos).
+    """
+    id: int
+    url: str
+    title: Optional[str]
+    current_price: Optional[float]
+
+    @classmethod
+    def of(cls, product: Product) -> "ProductSnapshot":
+        return cls(id=product.id, url=product.url, title=product.title, current_price=product.current_price)
+
+
+@dataclass
+class _Unit:
+    """Tudo o que um produto grava numa checagem."""
+    product_id: int
+    values: dict
+    price: Optional[float] = None
+    last_price: Optional[float] = None  # preço antes desta checagem (triggers)
+    state: Optional[dict] = None
+    product: Optional["ProductSnapshot"] = None
+
+
+def _changed(u: _Unit) -> bool:
+    """As respostas em cache do produto caducam? Toda checagem com preço mexe
+    no histórico (linha nova, sequência estendida ou agregado hora/dia), e
+    preço, título e estoque (`VISIBLE_COLUMNS`) aparecem em GET /products/{id},
+    inclusive numa página sem preço (produto esgotado)."""
+    return any(c in u.values for c in VISIBLE_COLUMNS)
+
+
+@dataclass
+class BatchWriter:
+    db: Session
+    batch_size: int = field(default_factory=lambda: settings.PERSIST_BATCH_SIZE)
+    flush_seconds: float = field(default_factory=lambda: settings.PERSIST_FLUSH_SECONDS)
+
+    def __post_init__(self):
+        self._units: List[_Unit] = []
+        self._last_flush = time.monotonic()
+        self.failed: Set[int] = set()
+
+    @property
+    def pending(self) -> int:
+        """Produtos agendados que ainda não passaram por um flush."""
+        return len(self._units)
+
+    def add_checked(self, product_id: int):
+        """Só registra a checagem (304 ou erro)."""
+        self._add(_Unit(product_id, {"last_checked_at": datetime.utcnow()}))
+
+    def add_result(self, product: ProductSnapshot, result: ScrapeResult, state: Optional[dict] = None) -> bool:
+        """Agenda a gravação de um parse. Retorna True se houve preço."""
+        values = {"last_checked_at": datetime.utcnow()}
+        updated = False
+
+        # Atualizar preço se encontrado
+        if result.price is not None:
+            values["current_price"] = result.price
+            updated = True
+            logger.info(f"Preço atualizado para produto {product.id}: R$ {result.price}")
+        else:
+            logger.warning(f"Preço não encontrado para produto {product.id} ({product.url})")
+
+        # Atualizar título se encontrado e não existir
+        if result.title and not product.title:
+            values["title"] = product.title = result.title
+            logger.info(f"Título atualizado para produto {product.id}: {result.title}")
+
+        # Atualizar status de estoque
+        if result.in_stock is not None:
+            values["in_stock"] = result.in_stock
+
+        self._add(_Unit(product.id, values, price=result.price, last_price=product.current_price,
+                        state=state, product=product))
+        if result.price is not None:
+            product.current_price = result.price
+        return updated
+
+    def _add(self, unit: _Unit):
+        self._units.append(unit)
+        if len(self._units) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def _write_history(self, units: List[_Unit]):
+        priced = [u for u in units if u.price is not None]
+        if settings.PRICE_HISTORY_MODE == "runs":
+            # preço igual ao anterior: só estende a sequência atual
+            same = [u for u in priced if u.price == u.last_price]
+            priced = [u for u in priced if u.price != u.last_price]
+            rows = [{"b_pid": u.product_id, "b_price": u.price, "b_seen": u.values["last_checked_at"]} for u in same]
+            if rows and self.db.execute(_extend_run(), rows).rowcount != len(rows):
+                # alguma não tinha sequência aberta (ex.: histórico apagado); como
+                # estender é idempotente, refaz uma a uma e grava as que faltaram
+                priced += [u for u, r in zip(same, rows) if self.db.execute(_extend_run(), r).rowcount == 0]
+        history = [
+            {"product_id": u.product_id, "price": u.price, "captured_at": u.values["last_checked_at"]}
+            for u in priced
+        ]
+        if history:
+            self.db.execute(insert(PriceHistory), history)
+
+    def _write_rollups(self, units: List[_Unit]):
+        # toda checagem com preço conta, inclusive as que só estenderam uma sequência
+        points = [(u.product_id, u.price, u.values["last_checked_at"]) for u in units if u.price is not None]
+        for model in ROLLUPS:
+            upsert(self.db, model, rollup_rows(model, points), ["product_id", "bucket"], merge=_merge_rollup)
+
+    def _write(self, units: List[_Unit]):
+        self._write_history(units)
+        self._write_rollups(units)
+
+        # bulk UPDATE por chave primária, agrupado pelo conjunto de colunas
+        groups: Dict[tuple, List[dict]] = {}
+        for u in units:
+            groups.setdefault(tuple(sorted(u.values)), []).append({"id": u.product_id, **u.values})
+        # carimbado já dentro da transação, logo antes do commit: o `since=` de
+        # GET /products ainda cobre com folga a diferença entre escritores
+        # concorrentes (PRODUCTS_SINCE_OVERLAP_SECONDS)
+        stamp = datetime.utcnow()
+        for columns, rows in groups.items():
+            if any(c in VISIBLE_COLUMNS for c in columns):
+                self.db.execute(_product_update(columns),
+                                [{"b_updated_at": stamp, **{f"b_{k}": v for k, v in r.items()}} for r in rows])
+            else:
+                self.db.execute(update(Product), rows)
+
+        upsert(self.db, FetchState, [u.state for u in units if u.state is not None], ["product_id"])
+        self._write_notifications(units)
+
+    def _write_notifications(self, units: List[_Unit]):
+        # triggers avaliados antes do commit: a notificação entra na outbox
+        # na mesma transação do preço que a disparou
+        fired = []
+        priced = [u for u in units if u.price is not None]
+        for u in priced:
+            fired += [(w, u.price, r, u) for w, r in apply_triggers(self.db, u.product_id, u.price, u.last_price)]
+        # watch que não disparou nesta checagem volta a notificar no próximo disparo
+        rearm(self.db, {u.product_id for u in priced}, {item[0].id for item in fired})
+        # disparos repetidos (mesmo watch, preço sem cair mais) não notificam
+        kept, states = debounce(self.db, fired, datetime.utcnow())
+        upsert(self.db, WatchFireState, states, ["watch_id"])
+        rows = []
+        for w, price, reason, u in kept:
+            rows += outbox_rows(u.product, price, u.last_price, [(w, reason)])
+        if rows:
+            self.db.execute(insert(Notification), rows)
+
+    def flush(self) -> Set[int]:
+        """Grava o lote pendente. Retorna os produtos que falharam neste flush."""
+        units, self._units = self._units, []
+        self._last_flush = time.monotonic()
+        if not units:
+            return set()
+
+        failed = set()
+        try:
+            self._write(units)
+            self.db.commit()
+            response_cache.invalidate(u.product_id for u in units if _changed(u))
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"Lote de {len(units)} produtos falhou ({e}); gravando um a um")
+            for u in units:
+                try:
+                    self._write([u])
+                    self.db.commit()
+                    if _changed(u):
+                        response_cache.invalidate([u.product_id])
+                except Exception as e:
+                    self.db.rollback()
+                    logger.error(f"Erro ao gravar produto {u.product_id}: {str(e)}")
+                    failed.add(u.product_id)
+                    # Ainda assim atualizar last_checked_at para evitar tentativas infinitas
+                    try:
+                        self.db.execute(update(Product), [{"id": u.product_id, "last_checked_at": datetime.utcnow()}])
+                        self.db.commit()
+                    except Exception as e:
+                        # banco fora: segue para os próximos, o produto volta no próximo ciclo
+                        self.db.rollback()
+                        logger.error(f"Erro ao marcar checagem do produto {u.product_id}: {str(e)}")
+        self.failed |= failed
+        return failed
@@ -0,0 +1,109 @@
+"""Fila de checagens em segundo plano da API.
+
+O `/track` não espera mais o site da loja: enfileira a primeira checagem e
+responde na hora com o id do job. Um pool pequeno de threads
+(SCRAPE_QUEUE_WORKERS) roda `check_product` com uma Session própria; o
+download passa pelo mesmo cliente/limitador do scraper (`http.fetch`).
+
+O estado dos jobs fica só em memória (os SCRAPE_QUEUE_MAX_JOBS mais
+recentes) e é consultado por `GET /scrape-jobs/{id}`. Um produto que já está
+na fila ou rodando não é enfileirado de novo: devolve o job existente.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+from ..core.db import SessionLocal
+from ..core.settings import settings
+from ..core.logger import logger
+from ..models.product import Product
+from .runner import check_product
+
+
+@dataclass
+class ScrapeJob:
+    id: str
+    product_id: int
+    status: str = "queued"  # queued | running | done | failed
+    updated: Optional[bool] = None
+    error: Optional[str] = None
+    created_at: datetime = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def as_dict(self) -> dict:
+        return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in asdict(self).items()}
+
+
+class ScrapeQueue:
+    def __init__(self, workers: Optional[int] = None, max_jobs: Optional[int] = None):
+        self.workers = workers or settings.SCRAPE_QUEUE_WORKERS
+        self.max_jobs = max_jobs or settings.SCRAPE_QUEUE_MAX_JOBS
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, ScrapeJob]" = OrderedDict()
+        self._pending: Dict[int, str] = {}  # product_id -> job na fila/rodando
+        self._lock = threading.Lock()
+
+    def submit(self, product_id: int) -> ScrapeJob:
+        """Enfileira uma checagem do produto (ou devolve a que já está pendente)."""
+        with self._lock:
+            job_id = self._pending.get(product_id)
+            if job_id is not None:
+                return self._jobs[job_id]
+            job = ScrapeJob(id=uuid.uuid4().hex, product_id=product_id, created_at=datetime.utcnow())
+            self._jobs[job.id] = job
+            self._pending[product_id] = job.id
+            self._trim()
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scrape-queue")
+            pool = self._pool
+        pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ScrapeJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _trim(self):
+        # descarta os mais antigos já terminados; pendentes nunca saem
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [j.id for j in self._jobs.values() if j.finished][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: ScrapeJob):
+        job.status, job.started_at = "running", datetime.utcnow()
+        db = SessionLocal()
+        try:
+            product = db.get(Product, job.product_id)
+            if product is None:
+                raise LookupError("Produto não encontrado")
+            job.updated = check_product(db, product)
+            job.status = "done"
+        except Exception as e:
+            job.status, job.error = "failed", str(e) or e.__class__.__name__
+            logger.warning({"event": "scrape_job_failed", "product_id": job.product_id, "error": job.error})
+        finally:
+            db.close()
+            job.finished_at = datetime.utcnow()
+            with self._lock:
+                self._pending.pop(job.product_id, None)
+        logger.info({"event": "scrape_job", "job_id": job.id, "product_id": job.product_id,
+                     "status": job.status, "updated": job.updated,
+                     "elapsed_s": round((job.finished_at - job.started_at).total_seconds(), 2)})
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+scrape_queue = ScrapeQueue()
@@ -0,0 +1,105 @@
+"""Limite de requisições por domínio (token bucket) com backoff em 429/503.
+
+As chaves são o mesmo domínio usado por `pick_adapter` (netloc sem "www.").
+Cada domínio tem seu próprio balde, então um varejista lento ou bloqueando
+não segura os demais.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from ..core.settings import settings
+
+
+class DomainBlocked(Exception):
+    """Domínio em backoff por mais tempo do que vale a pena esperar."""
+
+    def __init__(self, domain: str, wait: float):
+        super().__init__(f"{domain} em backoff por mais {wait:.0f}s")
+        self.domain = domain
+        self.wait = wait
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After em segundos; aceita número ou HTTP-date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class TokenBucket:
+    rate: float                 # tokens por segundo
+    capacity: float
+    tokens: float = field(default=0.0)
+    updated: float = field(default_factory=time.monotonic)
+    blocked_until: float = 0.0
+    failures: int = 0
+
+    def __post_init__(self):
+        self.tokens = self.capacity
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Segundos até poder consumir um token (0 = já pode)."""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+
+class DomainRateLimiter:
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default_rate: Optional[float] = None):
+        self.rates = rates if rates is not None else settings.RATE_LIMITS
+        self.default_rate = default_rate or settings.RATE_LIMIT_DEFAULT
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, domain: str) -> TokenBucket:
+        b = self._buckets.get(domain)
+        if b is None:
+            rate = self.rates.get(domain, self.default_rate)
+            b = self._buckets[domain] = TokenBucket(rate=rate, capacity=max(1.0, settings.RATE_LIMIT_BURST))
+        return b
+
+    async def acquire(self, domain: str):
+        b = self.bucket(domain)
+        while True:
+            now = time.monotonic()
+            if b.blocked_until - now > settings.RATE_LIMIT_MAX_WAIT:
+                raise DomainBlocked(domain, b.blocked_until - now)
+            wait = b.wait_time(now)
+            if wait <= 0:
+                b.tokens -= 1
+                return
+            await asyncio.sleep(wait)
+
+    def penalize(self, domain: str, retry_after: Optional[float] = None) -> float:
+        """Registra um 429/503 e bloqueia o domínio. Retorna o atraso aplicado."""
+        b = self.bucket(domain)
+        b.failures += 1
+        backoff = settings.RATE_LIMIT_BACKOFF_BASE * 2 ** (b.failures - 1)
+        delay = min(max(backoff, retry_after or 0.0), settings.RATE_LIMIT_BACKOFF_MAX)
+        b.blocked_until = max(b.blocked_until, time.monotonic() + delay)
+        return delay
+
+    def succeed(self, domain: str):
+        self.bucket(domain).failures = 0
+
+    def reset(self):
+        self._buckets.clear()
@@ -1,120 +1,97 @@
-import httpx
-from urllib.parse import urlparse
+from typing import Optional
 from sqlalchemy.orm import Session
-from .adapters.magalu import MagaluAdapter
-from .adapters.americanas import AmericanasAdapter
-from .adapters.fallback import FallbackAdapter
+from .adapters.base import ScrapeResult
+from .http import domain_of, fetch_limited, run_sync
+from .parsing import parse_page
+from .persist import BatchWriter, ProductSnapshot
 from ..models.product import Product
-from ..models.price_history import PriceHistory
-from ..models.watch import Watch
+from ..models.fetch_state import FetchState
 from ..core.logger import logger
 
-ADAPTERS = {
-    "magazineluiza.com.br": MagaluAdapter(),
-    "magalu.com": MagaluAdapter(),
-    "americanas.com.br": AmericanasAdapter(),
-}
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
-    "Accept-Language": "pt-BR,pt;q=0.9",
-}
-
-async_mode = False  # MVP síncrono
-
-
-def pick_adapter(domain: str):
-    return ADAPTERS.get(domain) or FallbackAdapter()
-
-
-def fetch_html(url: str) -> str:
-    with httpx.Client(headers=HEADERS, timeout=15.0, follow_redirects=True) as client:
-        resp = client.get(url)
-        resp.raise_for_status()
-        return resp.text
-
-
-def apply_triggers(db: Session, product: Product, new_price: float):
-    # busca último preço anterior
-    last = (
-        db.query(PriceHistory)
-        .filter(PriceHistory.product_id == product.id)
-        .order_by(PriceHistory.captured_at.desc())
-        .offset(1)
-        .first()
-    )
-    last_price = last.price if last else None
-
-    watches = db.query(Watch).filter(Watch.product_id == product.id, Watch.active == True).all()
-    fired = []
-    for w in watches:
-        triggered = False
-        reasons = []
-        if w.target_price is not None and new_price is not None:
-            if new_price <= w.target_price:
-                triggered = True
-                reasons.append(f"<= alvo {w.target_price}")
-        if w.drop_percent is not None and last_price is not None and new_price is not None:
-            delta = (last_price - new_price) / last_price * 100.0
-            if delta >= w.drop_percent:
-                triggered = True
-                reasons.append(f"queda {delta:.1f}% >= {w.drop_percent}%")
-        if triggered:
-            fired.append((w, "; ".join(reasons)))
-    # TODO cooldown/debounce + enfileirar notificação real
-    if fired:
-        logger.info({
-            "event": "triggers_fired",
-            "product_id": product.id,
-            "count": len(fired),
-            "details": [dict(watch_id=w.id, reason=r) for w, r in fired],
-        })
-
-
-def scrape_once(db: Session, product: Product) -> bool:
-    from datetime import datetime
-    
+def conditional_headers(state: Optional[FetchState]) -> dict:
+    """Cabeçalhos If-None-Match/If-Modified-Since a partir dos validadores salvos."""
+    headers = {}
+    if state is not None:
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+    return headers
+
+
+def known_hash(state: Optional[FetchState]) -> Optional[str]:
+    """Hash reaproveitável: só de páginas cujo parse rendeu preço."""
+    if state is None or state.price is None:
+        return None
+    return state.content_hash
+
+
+def reuse_result(state: Optional[FetchState]) -> ScrapeResult:
+    """Resultado anterior, para quando a página não mudou (304 ou hash igual)."""
+    if state is None:
+        # sem validadores salvos não há 304 nem hash conhecido; só por segurança
+        return ScrapeResult(title=None, price=None, in_stock=None, strategy="unchanged")
+    return ScrapeResult(title=state.title, price=state.price, in_stock=state.in_stock, strategy="unchanged")
+
+
+def fetch_state_row(product_id: int, resp, result: ScrapeResult, digest: str) -> Optional[dict]:
+    # só guarda validadores/hash de páginas que renderam preço; senão um 304
+    # ou hash igual impediria o re-parse de uma página que não entendemos
+    if result.price is None:
+        return None
+    return {
+        "product_id": product_id,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "content_hash": digest,
+        "title": result.title,
+        "price": result.price,
+        "in_stock": result.in_stock,
+    }
+
+
+def log_failure(product_id: int, error: Exception):
+    logger.error(f"Erro ao fazer scraping do produto {product_id}: {str(error)}")
+
+
+def check_product(db: Session, product: Product) -> bool:
+    """Checa e grava um produto; retorna True se achou preço.
+
+    Em erro (fetch, parse ou gravação) registra a checagem e repassa a
+    exceção, para quem precisa do motivo (a fila do /track).
+    """
+    snapshot = ProductSnapshot.of(product)
+    writer = BatchWriter(db)
     try:
-        domain = urlparse(product.url).netloc.replace("www.", "")
-        adapter = pick_adapter(domain)
-        html = fetch_html(product.url)
-        result = adapter.parse(html)
-
-        updated = False
-        
-        # Sempre atualizar last_checked_at
-        product.last_checked_at = datetime.utcnow()
-        
-        # Atualizar preço se encontrado
-        if result.price is not None:
-            ph = PriceHistory(product_id=product.id, price=result.price)
-            db.add(ph)
-            product.current_price = result.price
-            updated = True
-            logger.info(f"Preço atualizado para produto {product.id}: R$ {result.price}")
+        state = db.get(FetchState, snapshot.id)
+        resp = run_sync(fetch_limited(snapshot.url, conditional_headers(state)))
+        if resp.status_code == 304:
+            # página igual à última versão: mesmo caminho de um hash igual
+            # (triggers, sequência do histórico e agregados)
+            updated = writer.add_result(snapshot, reuse_result(state))
         else:
-            logger.warning(f"Preço não encontrado para produto {product.id} ({product.url})")
-            
-        # Atualizar título se encontrado e não existir
-        if result.title and not product.title:
-            product.title = result.title
-            logger.info(f"Título atualizado para produto {product.id}: {result.title}")
-            
-        # Atualizar status de estoque
-        if result.in_stock is not None:
-            product.in_stock = result.in_stock
-
-        db.commit()
-
-        # Disparar triggers se preço foi encontrado
-        if result.price is not None:
-            apply_triggers(db, product, result.price)
-
-        return updated
-        
+            digest, result = parse_page(domain_of(snapshot.url), resp.content, resp.charset_encoding, known_hash(state))
+            if result is None:
+                result = reuse_result(state)
+            updated = writer.add_result(snapshot, result, fetch_state_row(snapshot.id, resp, result, digest))
     except Exception as e:
-        logger.error(f"Erro ao fazer scraping do produto {product.id}: {str(e)}")
+        log_failure(snapshot.id, e)
         # Ainda assim atualizar last_checked_at para evitar tentativas infinitas
-        product.last_checked_at = datetime.utcnow()
-        db.commit()
+        writer.add_checked(snapshot.id)
+        writer.flush()
+        raise
+    writer.flush()
+    # `writer.failed` acumula todos os flushes: add_result também pode ter
+    # gravado o lote sozinho (tempo esgotado durante o fetch)
+    if snapshot.id in writer.failed:
+        raise RuntimeError(f"Erro ao gravar produto {snapshot.id}")
+    return updated
+
+
+def scrape_once(db: Session, product: Product) -> bool:
+    """Como `check_product`, mas uma falha vira False (já foi logada)."""
+    try:
+        return check_product(db, product)
+    except Exception:
         return False
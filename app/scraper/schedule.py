@@ -0,0 +1,153 @@
+"""Agendamento adaptativo das checagens.
+
+Em vez de varrer todos os produtos a cada 3h, cada produto ganha um próximo
+horário de checagem calculado pela frequência com que o preço mudou na
+janela recente (`PriceHistory`) e por ter ou não `Watch`es ativos. Os
+horários ficam num heap; o worker só busca os produtos vencidos.
+"""
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from ..models.product import Product
+from ..models.price_history import PriceHistory
+from ..models.watch import Watch
+from ..core.settings import settings
+from ..core.logger import logger
+
+
+def _ts(dt: Optional[datetime]) -> Optional[float]:
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        # gravamos datetime.utcnow() (naive) no banco
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def count_price_changes(db: Session, product_ids: Iterable[int], since: datetime) -> Dict[int, Optional[int]]:
+    """Número de mudanças de preço por produto desde `since`.
+
+    None indica que não há observações suficientes (menos de duas) para
+    estimar a volatilidade.
+    """
+    ids = list(product_ids)
+    rows = (
+        db.query(PriceHistory.product_id, PriceHistory.price, PriceHistory.last_seen_at)
+        .filter(PriceHistory.product_id.in_(ids))
+        .filter(PriceHistory.seen_since(since))
+        .order_by(PriceHistory.product_id, PriceHistory.captured_at)
+        .all()
+    )
+    seen: Dict[int, int] = {}
+    changes: Dict[int, int] = {}
+    last: Dict[int, float] = {}
+    for product_id, price, last_seen_at in rows:
+        # uma sequência (modo "runs") vale por pelo menos duas observações
+        seen[product_id] = seen.get(product_id, 0) + (2 if last_seen_at else 1)
+        if product_id in last and last[product_id] != price:
+            changes[product_id] = changes.get(product_id, 0) + 1
+        last[product_id] = price
+    return {pid: (changes.get(pid, 0) if seen.get(pid, 0) >= 2 else None) for pid in ids}
+
+
+def watched_product_ids(db: Session) -> Set[int]:
+    rows = db.query(Watch.product_id).filter(Watch.active == True).distinct().all()
+    return {pid for (pid,) in rows}
+
+
+class AdaptiveScheduler:
+    def __init__(self):
+        self.min_interval = settings.SCHEDULE_MIN_INTERVAL_MINUTES * 60
+        self.max_interval = settings.SCHEDULE_MAX_INTERVAL_HOURS * 3600
+        self.default_interval = settings.SCHEDULE_DEFAULT_INTERVAL_HOURS * 3600
+        self.window = timedelta(days=settings.SCHEDULE_WINDOW_DAYS)
+        self._heap: List[tuple] = []      # (due_ts, product_id), remoção preguiçosa
+        self._due: Dict[int, float] = {}  # entrada válida de cada produto
+        self._watched: Set[int] = set()
+        self._max_id = 0
+
+    def interval_for(self, changes: Optional[int], watched: bool) -> float:
+        """Intervalo (s) até a próxima checagem.
+
+        Checa duas vezes por intervalo médio entre mudanças; produtos com
+        watch ativo checam com mais frequência. Sempre entre min e max.
+        """
+        if changes is None:
+            interval = self.default_interval
+        elif changes == 0:
+            interval = self.max_interval
+        else:
+            interval = self.window.total_seconds() / changes / 2
+        if watched:
+            interval *= settings.SCHEDULE_WATCHED_FACTOR
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _push(self, product_id: int, due: float):
+        self._due[product_id] = due
+        heapq.heappush(self._heap, (due, product_id))
+
+    def _intervals(self, db: Session, product_ids: List[int]) -> Dict[int, float]:
+        since = datetime.utcnow() - self.window
+        changes = count_price_changes(db, product_ids, since)
+        return {pid: self.interval_for(changes[pid], pid in self._watched) for pid in product_ids}
+
+    def refresh(self, db: Session):
+        """Inclui produtos novos e antecipa os que ganharam watch."""
+        watched = watched_product_ids(db)
+        newly_watched = watched - self._watched
+        self._watched = watched
+
+        new = (
+            db.query(Product.id, Product.last_checked_at)
+            .filter(Product.id > self._max_id)
+            .order_by(Product.id)
+            .all()
+        )
+        if new:
+            intervals = self._intervals(db, [pid for pid, _ in new])
+            for pid, checked_at in new:
+                last = _ts(checked_at)
+                self._push(pid, last + intervals[pid] if last else time.time())
+            self._max_id = new[-1][0]
+
+        pending = [pid for pid in newly_watched if pid in self._due]
+        if pending:
+            intervals = self._intervals(db, pending)
+            for pid in pending:
+                due = min(self._due[pid], time.time() + intervals[pid])
+                if due < self._due[pid]:
+                    self._push(pid, due)
+
+    def pop_due(self, limit: int, now: Optional[float] = None) -> List[int]:
+        now = now or time.time()
+        due = []
+        while self._heap and len(due) < limit and self._heap[0][0] <= now:
+            ts, pid = heapq.heappop(self._heap)
+            if self._due.get(pid) != ts:
+                continue  # entrada obsoleta
+            del self._due[pid]
+            due.append(pid)
+        return due
+
+    def reschedule(self, db: Session, product_ids: List[int]):
+        """Recalcula o próximo horário dos produtos que acabaram de ser checados
+        (ou que saíram do heap num ciclo que falhou). Nunca levanta."""
+        if not product_ids:
+            return
+        now = time.time()
+        try:
+            intervals = self._intervals(db, product_ids)
+        except Exception:
+            # banco fora: os ids já saíram do heap e `refresh` não os traz de
+            # volta (_max_id já passou deles); volta sem consultar o banco
+            logger.exception({"event": "reschedule_error", "products": len(product_ids)})
+            intervals = {pid: self.min_interval for pid in product_ids}
+        for pid, interval in intervals.items():
+            self._push(pid, now + interval)
+
+    def __len__(self):
+        return len(self._due)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Set
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from .watch_index import watch_index
+from ..models.watch_fire_state import WatchFireState
+from ..core.settings import settings
+from ..core.logger import logger
+
+
+def apply_triggers(db: Session, product_id: int, new_price: float, last_price: Optional[float]):
+    """Avalia os watches do produto.
+
+    `last_price` é o preço antes desta checagem (o `current_price` que o
+    produto tinha), então não é preciso voltar ao histórico para achá-lo.
+    Os watches vêm do índice em memória (`watch_index`), sem consulta por
+    produto. O `BatchWriter` passa os disparados por `debounce` e grava o
+    que sobrar na outbox.
+    """
+    fired = watch_index.fired(db, product_id, new_price, last_price)
+    if fired:
+        logger.info({
+            "event": "triggers_fired",
+            "product_id": product_id,
+            "count": len(fired),
+            "details": [dict(watch_id=w.id, reason=r) for w, r in fired],
+        })
+    return fired
+
+
+def debounce(db: Session, fired: List[tuple], now: datetime):
+    """Descarta disparos repetidos.
+
+    Um watch que já disparou só dispara de novo se o preço cair abaixo do
+    último preço notificado ou depois de TRIGGER_COOLDOWN_HOURS, enquanto a
+    condição se mantiver: uma checagem em que ele não dispara o rearma
+    (`rearm`). Recebe tuplas (watch, preço, ...) e devolve as que passam,
+    intactas, e as linhas novas de `watch_fire_state`.
+    """
+    if not fired:
+        return [], []
+    ids = {item[0].id for item in fired}
+    states = {
+        wid: (price, _utc(until))
+        for wid, price, until in db.query(
+            WatchFireState.watch_id, WatchFireState.last_price, WatchFireState.cooldown_until
+        ).filter(WatchFireState.watch_id.in_(ids))
+    }
+    until = now + timedelta(hours=settings.TRIGGER_COOLDOWN_HOURS)
+    kept, rows = [], {}
+    for item in fired:
+        w, price = item[0], item[1]
+        state = states.get(w.id)
+        if state is not None and price >= state[0] and now < state[1]:
+            continue
+        states[w.id] = (price, until)
+        rows[w.id] = {"watch_id": w.id, "last_price": price, "fired_at": now, "cooldown_until": until}
+        kept.append(item)
+    if len(kept) < len(fired):
+        logger.info({"event": "triggers_suppressed", "count": len(fired) - len(kept)})
+    return kept, list(rows.values())
+
+
+def rearm(db: Session, product_ids: Iterable[int], fired_ids: Set[int]):
+    """Apaga o estado de disparo dos watches dos produtos checados (com preço)
+    que não dispararam desta vez: a condição acabou (preço voltou acima do
+    alvo, não caiu), então a próxima vez que ela valer é um disparo novo."""
+    quiet = set()
+    for product_id in product_ids:
+        quiet |= watch_index.watch_ids(db, product_id)
+    quiet -= fired_ids
+    if quiet:
+        db.execute(delete(WatchFireState).where(WatchFireState.watch_id.in_(quiet)))
+
+
+def _utc(dt: datetime) -> datetime:
+    # gravamos datetime.utcnow() (naive); Postgres devolve com fuso
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
@@ -0,0 +1,119 @@
+"""Índice em memória dos watches ativos, para avaliar triggers sem ir ao banco.
+
+Por produto, os limites ficam em listas ordenadas:
+
+- `target_price` crescente: disparam os watches com alvo >= preço novo,
+  ou seja, o sufixo a partir de `bisect_left(alvos, preço)`;
+- `drop_percent` crescente: disparam os com queda <= queda observada,
+  o prefixo até `bisect_right(quedas, queda)`.
+
+Cada avaliação custa O(log n + disparados). O índice é carregado com uma
+consulta só e recarregado a cada WATCH_INDEX_TTL_SECONDS, para ver watches
+criados em outro processo (API → worker); no próprio processo, `/track`
+chama `add` e o watch entra na hora.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.watch import Watch
+from ..core.settings import settings
+
+
+@dataclass(frozen=True)
+class WatchEntry:
+    id: int
+    product_id: int
+    channel: str
+    endpoint: str
+    target_price: Optional[float]
+    drop_percent: Optional[float]
+
+    @classmethod
+    def of(cls, w: Watch) -> "WatchEntry":
+        return cls(w.id, w.product_id, w.channel, w.endpoint, w.target_price, w.drop_percent)
+
+
+@dataclass
+class _ProductWatches:
+    targets: List[Tuple[float, int]] = field(default_factory=list)  # (target_price, watch_id)
+    drops: List[Tuple[float, int]] = field(default_factory=list)    # (drop_percent, watch_id)
+
+    def add(self, w: WatchEntry):
+        if w.target_price is not None:
+            insort(self.targets, (w.target_price, w.id))
+        if w.drop_percent is not None:
+            insort(self.drops, (w.drop_percent, w.id))
+
+
+class WatchIndex:
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.WATCH_INDEX_TTL_SECONDS
+        self._lock = threading.Lock()
+        self._by_product: Dict[int, _ProductWatches] = {}
+        self._entries: Dict[int, WatchEntry] = {}
+        self._loaded_at: Optional[float] = None
+
+    def load(self, db: Session):
+        rows = db.query(Watch).filter(Watch.active == True).all()
+        by_product: Dict[int, _ProductWatches] = {}
+        entries = {}
+        for w in rows:
+            entry = entries[w.id] = WatchEntry.of(w)
+            by_product.setdefault(w.product_id, _ProductWatches()).add(entry)
+        with self._lock:
+            self._by_product, self._entries = by_product, entries
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self, db: Session):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+            self.load(db)
+
+    def add(self, watch: Watch):
+        """Inclui um watch recém-criado (chamado por `/track`)."""
+        if not watch.active or self._loaded_at is None:
+            return  # ainda não carregado: a primeira carga já traz o watch
+        entry = WatchEntry.of(watch)
+        with self._lock:
+            if entry.id in self._entries:
+                return
+            self._entries[entry.id] = entry
+            self._by_product.setdefault(entry.product_id, _ProductWatches()).add(entry)
+
+    def invalidate(self):
+        """Força recarga na próxima avaliação (ex.: watch desativado)."""
+        self._loaded_at = None
+
+    def watch_ids(self, db: Session, product_id: int) -> Set[int]:
+        """Ids dos watches ativos do produto."""
+        self._ensure_fresh(db)
+        pw = self._by_product.get(product_id)
+        if pw is None:
+            return set()
+        return {wid for _, wid in pw.targets} | {wid for _, wid in pw.drops}
+
+    def fired(self, db: Session, product_id: int, new_price: float,
+              last_price: Optional[float]) -> List[Tuple[WatchEntry, str]]:
+        """Watches disparados pelo preço novo, com o motivo de cada um."""
+        self._ensure_fresh(db)
+        pw = self._by_product.get(product_id)
+        if pw is None or new_price is None:
+            return []
+        reasons: Dict[int, List[str]] = {}
+        for target, wid in pw.targets[bisect_left(pw.targets, (new_price, -1)):]:
+            reasons.setdefault(wid, []).append(f"<= alvo {target}")
+        if last_price:
+            delta = (last_price - new_price) / last_price * 100.0
+            for drop, wid in pw.drops[:bisect_right(pw.drops, (delta, float("inf")))]:
+                reasons.setdefault(wid, []).append(f"queda {delta:.1f}% >= {drop}%")
+        return [(self._entries[wid], "; ".join(r)) for wid, r in reasons.items()]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+watch_index = WatchIndex()
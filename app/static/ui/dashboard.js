@@ -0,0 +1,365 @@
+// Estado global
+let products = [];
+let currentTab = 'track';
+
+// Inicialização
+document.addEventListener('DOMContentLoaded', function() {
+    setupEventListeners();
+    loadProducts();
+});
+
+function setupEventListeners() {
+    document.getElementById('trackForm').addEventListener('submit', handleTrackSubmit);
+    document.getElementById('channel').addEventListener('change', updateEndpointPlaceholder);
+}
+
+function switchTab(tabName) {
+    // Atualizar botões
+    document.querySelectorAll('.tab').forEach(tab => tab.classList.remove('active'));
+    document.querySelector(`[onclick="switchTab('${tabName}')"]`).classList.add('active');
+
+    // Atualizar conteúdo
+    document.querySelectorAll('.tab-content').forEach(content => content.classList.remove('active'));
+    document.getElementById(`${tabName}-tab`).classList.add('active');
+
+    currentTab = tabName;
+
+    // Carregar dados específicos da aba
+    if (tabName === 'products') {
+        loadProducts();
+    } else if (tabName === 'stats') {
+        loadStats();
+    }
+}
+
+function updateEndpointPlaceholder() {
+    const channel = document.getElementById('channel').value;
+    const endpoint = document.getElementById('endpoint');
+
+    if (channel === 'email') {
+        endpoint.type = 'email';
+        endpoint.placeholder = 'seu-email@exemplo.com';
+    } else {
+        endpoint.type = 'text';
+        endpoint.placeholder = 'web-push-endpoint';
+    }
+}
+
+async function handleTrackSubmit(event) {
+    event.preventDefault();
+
+    const url = document.getElementById('url').value.trim();
+    const targetPrice = document.getElementById('targetPrice').value;
+    const dropPercent = document.getElementById('dropPercent').value;
+    const channel = document.getElementById('channel').value;
+    const endpoint = document.getElementById('endpoint').value.trim();
+
+    // Validações
+    if (!url) {
+        showStatus('trackStatus', 'URL do produto é obrigatória', 'error');
+        return;
+    }
+
+    if (!targetPrice && !dropPercent) {
+        showStatus('trackStatus', 'Defina um preço alvo ou percentual de queda', 'error');
+        return;
+    }
+
+    if (!endpoint) {
+        showStatus('trackStatus', 'Email/endpoint é obrigatório', 'error');
+        return;
+    }
+
+    // Preparar dados
+    const requestBody = {
+        url: url,
+        channel: channel,
+        endpoint: endpoint
+    };
+
+    if (targetPrice) requestBody.target_price = parseFloat(targetPrice);
+    if (dropPercent) requestBody.drop_percent = parseFloat(dropPercent);
+
+    // Enviar requisição
+    await trackProduct(requestBody);
+}
+
+async function trackProduct(data) {
+    const btn = document.querySelector('#trackForm button[type="submit"]');
+    const originalText = btn.innerHTML;
+
+    try {
+        btn.innerHTML = '<span class="loading"></span>Processando...';
+        btn.disabled = true;
+
+        const response = await fetch('/track', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(data)
+        });
+
+        const result = await response.json();
+
+        if (response.ok) {
+            showStatus('trackStatus', `Produto monitorado! ID: ${result.product_id} — verificando preço...`, 'info');
+
+            // Limpar formulário
+            document.getElementById('trackForm').reset();
+
+            // 1ª checagem roda em segundo plano: acompanha pelo job
+            followScrapeJob(result.status_url, (job) => {
+                if (job.status === 'done') {
+                    showStatus('trackStatus', `Produto monitorado com sucesso! ID: ${result.product_id}`, 'success');
+                } else {
+                    showStatus('trackStatus', `Produto monitorado (ID: ${result.product_id}), mas a 1ª checagem falhou (${job.error}); o worker tenta de novo.`, 'error');
+                }
+                if (currentTab === 'products') {
+                    loadProducts();
+                }
+            });
+        } else {
+            throw new Error(result.detail || 'Erro desconhecido');
+        }
+
+    } catch (error) {
+        console.error('Erro:', error);
+        showStatus('trackStatus', `Erro: ${error.message}`, 'error');
+    } finally {
+        btn.innerHTML = originalText;
+        btn.disabled = false;
+    }
+}
+
+async function followScrapeJob(statusUrl, onFinish, attempts = 30) {
+    // consulta o status a cada 1s até terminar (ou desistir após `attempts`)
+    for (let i = 0; i < attempts; i++) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        try {
+            const response = await fetch(statusUrl);
+            if (!response.ok) return;
+            const job = await response.json();
+            if (job.status === 'done' || job.status === 'failed') {
+                onFinish(job);
+                return;
+            }
+        } catch (error) {
+            console.error('Erro ao consultar job:', error);
+        }
+    }
+}
+
+let listedProductIds = [];
+
+async function checkAllProducts() {
+    // uma chamada só; cada linha do NDJSON chega quando o produto termina
+    if (listedProductIds.length === 0) return;
+    const btn = document.getElementById('checkAllBtn');
+    const originalText = btn.innerHTML;
+    btn.innerHTML = '<span class="loading"></span>Verificando...';
+    btn.disabled = true;
+    try {
+        const response = await fetch('/scrape-now/bulk', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ product_ids: listedProductIds })
+        });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let done = 0;
+        while (true) {
+            const { value, done: finished } = await reader.read();
+            if (finished) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (!line) continue;
+                const item = JSON.parse(line);
+                if (item.event !== 'product') continue;
+                done++;
+                btn.innerHTML = `<span class="loading"></span>${done}/${listedProductIds.length}`;
+                const priceEl = document.getElementById(`price-${item.product_id}`);
+                if (priceEl) {
+                    priceEl.textContent = item.status === 'failed' ? 'Falha na verificação'
+                        : item.price ? `R$ ${item.price.toFixed(2)}` : 'Preço não disponível';
+                }
+            }
+        }
+        loadProducts();
+    } catch (error) {
+        alert('Erro: ' + error.message);
+    } finally {
+        btn.innerHTML = originalText;
+        btn.disabled = false;
+    }
+}
+
+async function loadProducts() {
+    const container = document.getElementById('productsList');
+
+    try {
+        container.innerHTML = '<div style="text-align: center; padding: 20px;"><span class="loading"></span> Carregando produtos...</div>';
+
+        const response = await fetch('/products');
+
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+
+        const products = await response.json();
+        listedProductIds = products.map(p => p.id);
+
+        if (products.length === 0) {
+            container.innerHTML = `
+                <div style="text-align: center; padding: 40px; color: #666;">
+                    <h4>Nenhum produto monitorado ainda</h4>
+                    <p>Vá para a aba "Monitorar Produto" para adicionar seu primeiro produto!</p>
+                    <button class="btn btn-primary" onclick="switchTab('track')" style="margin-top: 15px;">
+                        Adicionar Produto
+                    </button>
+                </div>
+            `;
+            return;
+        }
+
+        let html = '';
+        products.forEach(product => {
+            const domain = getDomainFromUrl(product.url);
+            const price = product.current_price ? `R$ ${product.current_price.toFixed(2)}` : 'Preço não disponível';
+            const stock = product.in_stock ? 'Em estoque' : 'Fora de estoque';
+            const previous = product.previous_price ? ` <span style="font-size: 14px; color: #999; text-decoration: line-through;">R$ ${product.previous_price.toFixed(2)}</span>` : '';
+
+            html += `
+                <div class="product-card">
+                    <div class="product-title">${product.title || 'Produto sem título'}</div>
+                    <div class="product-url">${domain} • ID: ${product.id}</div>
+                    <div class="product-price" id="price-${product.id}">${price}${previous}</div>
+                    <div style="margin-bottom: 15px; font-size: 14px; color: #666;">
+                        ${stock} • Última verificação: ${formatDate(product.last_checked_at)}
+                    </div>
+                    <div class="product-actions">
+                        <button class="btn btn-secondary" onclick="scrapeProduct(${product.id})">
+                            Verificar Agora
+                        </button>
+                        <button class="btn btn-secondary" onclick="viewHistory(${product.id})">
+                            Ver Histórico
+                        </button>
+                        <a href="${product.url}" target="_blank" class="btn btn-secondary">
+                            Ver Produto
+                        </a>
+                    </div>
+                </div>
+            `;
+        });
+
+        container.innerHTML = html;
+
+        // Atualizar estatísticas
+        document.getElementById('totalProducts').textContent = products.length;
+
+    } catch (error) {
+        console.error('Erro ao carregar produtos:', error);
+        container.innerHTML = `
+            <div style="text-align: center; padding: 40px; color: #e74c3c;">
+                ❌ Erro ao carregar produtos: ${error.message}
+                <br><br>
+                <button class="btn btn-secondary" onclick="loadProducts()">Tentar Novamente</button>
+            </div>
+        `;
+    }
+}
+
+async function loadStats() {
+    try {
+        // Estatísticas simuladas - em produção, criar endpoints específicos
+        document.getElementById('totalProducts').textContent = '0';
+        document.getElementById('totalChecks').textContent = '0';
+        document.getElementById('avgPrice').textContent = 'R$ 0';
+    } catch (error) {
+        console.error('Erro ao carregar estatísticas:', error);
+    }
+}
+
+async function scrapeProduct(productId) {
+    try {
+        const response = await fetch(`/scrape-now?product_id=${productId}`, {
+            method: 'POST'
+        });
+
+        const result = await response.json();
+
+        if (response.ok) {
+            alert('Verificação realizada com sucesso!');
+            loadProducts();
+        } else {
+            alert('Erro na verificação: ' + (result.detail || 'Erro desconhecido'));
+        }
+    } catch (error) {
+        alert('Erro: ' + error.message);
+    }
+}
+
+function viewHistory(productId) {
+    window.open(`/ui/history/${productId}`, '_blank');
+}
+
+function getDomainFromUrl(url) {
+    try {
+        return new URL(url).hostname.replace('www.', '');
+    } catch {
+        return 'Desconhecido';
+    }
+}
+
+function formatDate(dateString) {
+    try {
+        const date = new Date(dateString);
+        return date.toLocaleString('pt-BR', {
+            day: '2-digit',
+            month: '2-digit',
+            year: 'numeric',
+            hour: '2-digit',
+            minute: '2-digit'
+        });
+    } catch {
+        return 'Data inválida';
+    }
+}
+
+function showStatus(elementId, message, type) {
+    const statusEl = document.getElementById(elementId);
+    statusEl.textContent = message;
+    statusEl.className = `status ${type}`;
+    statusEl.style.display = 'block';
+
+    // Auto-hide após 5 segundos para mensagens de sucesso
+    if (type === 'success') {
+        setTimeout(() => {
+            statusEl.style.display = 'none';
+        }, 5000);
+    }
+}
+
+// Função para testar a API
+async function testAPI() {
+    try {
+        const response = await fetch('/');
+        const data = await response.json();
+        console.log('API Status:', data);
+        return response.ok;
+    } catch (error) {
+        console.error('API não disponível:', error);
+        return false;
+    }
+}
+
+// Testar API na inicialização
+testAPI().then(isOnline => {
+    if (!isOnline) {
+        showStatus('trackStatus', '⚠️ API offline. Verifique se o servidor está rodando.', 'error');
+    }
+});
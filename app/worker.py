@@ -3,24 +3,46 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from sqlalchemy.orm import Session
 from .core.db import SessionLocal
 from .models.product import Product
-from .scraper.runner import scrape_once
+from .scraper.engine import ScrapeEngine, shutdown_parse_pool
+from .scraper.schedule import AdaptiveScheduler
+from .scraper import http
+from .notifier.dispatcher import dispatchers
+from .notifier import email, webpush
+from .core.settings import settings
+from .core.logger import logger
 from random import randint
 from time import sleep
 
 scheduler = BackgroundScheduler()
+adaptive = AdaptiveScheduler()
 
-@scheduler.scheduled_job("interval", hours=3)
+@scheduler.scheduled_job("interval", seconds=settings.SCHEDULER_TICK_SECONDS, max_instances=1)
 def job():
     db: Session = SessionLocal()
+    due = []
     try:
-        for product in db.query(Product).all():
-            try:
-                scrape_once(db, product)
-            except Exception as e:
-                print("erro scraping", product.id, e)
+        adaptive.refresh(db)
+        due = adaptive.pop_due(limit=settings.SCHEDULE_BATCH_SIZE)
+        if not due:
+            return
+        products = db.query(Product).filter(Product.id.in_(due)).all()
+        # produtos removidos do banco simplesmente saem da fila
+        due = [p.id for p in products]
+        logger.info({"event": "schedule_tick", "due": len(products), "queued": len(adaptive)})
+        http.run_sync(ScrapeEngine().run(db, products))
+    except Exception:
+        logger.exception({"event": "scrape_cycle_error"})
     finally:
+        # mesmo com erro: o que saiu do heap precisa voltar para ele
+        adaptive.reschedule(db, due)
         db.close()
 
+# notificações: um job por canal, fora do ciclo de scraping
+notifiers = dispatchers()
+for d in notifiers:
+    scheduler.add_job(d.drain, "interval", seconds=settings.NOTIFY_POLL_SECONDS, max_instances=1,
+                      id=f"notify-{d.channel}")
+
 if __name__ == "__main__":
     scheduler.start()
     try:
@@ -28,3 +50,9 @@ if __name__ == "__main__":
             sleep(60)
     except KeyboardInterrupt:
         scheduler.shutdown()
+        for d in notifiers:
+            d.close()
+        email.close()
+        webpush.close()
+        shutdown_parse_pool()
+        http.close()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Latência das rotas de leitura com muitas requisições simultâneas: rotas
+síncronas (Session no threadpool do FastAPI, como eram) contra as rotas
+assíncronas atuais (AsyncSession, aiosqlite/asyncpg).
+
+    python benchmarks/api_latency.py [--requests 4000] [--concurrency 200]
+
+Usa um SQLite temporário (ou DATABASE_URL, se definida) populado com
+--products produtos e --history pontos por produto. Cada variante roda num
+uvicorn próprio (subprocesso, um worker) e a carga sai deste processo por
+HTTP local. Com SQLite o ganho é menor: o aiosqlite também usa uma thread
+por conexão; com Postgres (asyncpg) a espera pelo banco não ocupa threads.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.core.db import SessionLocal, get_db  # noqa: E402
+from app.core.migrations import upgrade_db  # noqa: E402
+from app.api.routes import router  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.price_history import PriceHistory  # noqa: E402
+
+
+def seed(products: int, history: int):
+    db = SessionLocal()
+    if db.query(Product).count() >= products:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(Product), [
+        {"url": f"https://bench.local/p/{i}", "domain": "bench.local", "title": f"Produto {i}",
+         "current_price": 100.0, "last_checked_at": now}
+        for i in range(products)
+    ])
+    ids = [pid for (pid,) in db.query(Product.id)]
+    db.execute(insert(PriceHistory), [
+        {"product_id": pid, "price": 100.0 - j % 7, "captured_at": now - timedelta(hours=j)}
+        for pid in ids for j in range(history)
+    ])
+    db.commit()
+    db.close()
+
+
+def sync_app() -> FastAPI:
+    """As mesmas leituras como rotas `def` com Session (o que havia antes)."""
+    app = FastAPI()
+
+    @app.get("/products/{product_id}")
+    def get_product(product_id: int, db: Session = Depends(get_db)):
+        p = db.get(Product, product_id)
+        return {"id": p.id, "url": p.url, "title": p.title, "current_price": p.current_price}
+
+    @app.get("/products/{product_id}/history")
+    def get_history(product_id: int, days: int = 30, db: Session = Depends(get_db)):
+        since = datetime.utcnow() - timedelta(days=days)
+        q = (
+            db.query(PriceHistory)
+            .filter(PriceHistory.product_id == product_id, PriceHistory.captured_at >= since)
+            .order_by(PriceHistory.captured_at.desc())
+        )
+        return [{"price": ph.price, "captured_at": ph.captured_at.isoformat()} for ph in q]
+
+    @app.get("/products")
+    def list_products(limit: int = 50, db: Session = Depends(get_db)):
+        return [{"id": p.id, "title": p.title} for p in
+                db.query(Product).order_by(Product.last_checked_at.desc()).limit(limit)]
+
+    return app
+
+
+def async_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def serve(factory: str, port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", f"api_latency:{factory}",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=Path(__file__).resolve().parent,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"uvicorn ({factory}) não subiu")
+
+
+async def run(base_url: str, paths, concurrency: int) -> dict:
+    latencies = []
+    queue = list(paths)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            while queue:
+                path = queue.pop()
+                started = time.perf_counter()
+                resp = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                resp.raise_for_status()
+
+        await client.get(paths[0])  # aquece
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100)
+    return {"rps": len(latencies) / elapsed, "p50": q[49] * 1000, "p99": q[98] * 1000}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=4000)
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--products", type=int, default=500)
+    ap.add_argument("--history", type=int, default=200, help="pontos de histórico por produto")
+    args = ap.parse_args()
+
+    upgrade_db()
+    seed(args.products, args.history)
+    rnd = random.Random(42)
+    paths = [
+        rnd.choice([f"/products/{rnd.randint(1, args.products)}",
+                    f"/products/{rnd.randint(1, args.products)}/history?days=7",
+                    "/products?limit=50"])
+        for _ in range(args.requests)
+    ]
+
+    print(f"{args.requests} requisições, {args.concurrency} simultâneas, {os.environ['DATABASE_URL']}")
+    for name, factory, port in (("sync (threadpool)", "sync_app", 8791), ("async", "async_app", 8792)):
+        proc = serve(factory, port)
+        try:
+            r = asyncio.run(run(f"http://127.0.0.1:{port}", paths, args.concurrency))
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"{name:18} {r['rps']:8.0f} req/s   p50 {r['p50']:7.1f} ms   p99 {r['p99']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
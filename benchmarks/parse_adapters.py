@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compara tempo e pico de memória do parse dos adapters (lxml/XPath) com o
+parse completo via BeautifulSoup, usando tests/fixtures/sample_magalu.html.
+
+    python benchmarks/parse_adapters.py [--repeat 2000] [--pad 2000]
+
+--pad infla a fixture com blocos de conteúdo para simular uma página real
+(as páginas de produto costumam ter centenas de KB). O pico vem do
+tracemalloc, então só conta memória alocada pelo Python; a árvore do
+libxml2 (C) fica de fora nos dois lados.
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from app.scraper.adapters.magalu import MagaluAdapter  # noqa: E402
+
+FIXTURE = ROOT / "tests" / "fixtures" / "sample_magalu.html"
+
+
+def soup_parse(html: bytes):
+    # o que o adapter fazia antes: árvore inteira + busca em todos os textos
+    soup = BeautifulSoup(html, "lxml")
+    t = soup.select_one("h1") or soup.select_one('[itemprop="name"]')
+    p = soup.select_one("[data-testid='price-value']") or soup.select_one(".price__buy-box .price-template__text")
+    oos = soup.find(string=lambda x: x and "indisponível" in x.lower())
+    return t, p, oos
+
+
+def measure(fn, html: bytes, repeat: int):
+    gc.collect()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(html)
+    per_call = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_call, peak
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=2000)
+    ap.add_argument("--pad", type=int, default=0, help="blocos extras de conteúdo")
+    args = ap.parse_args()
+
+    html = FIXTURE.read_bytes()
+    if args.pad:
+        block = b'<div class="card"><a href="/p/1">Outro produto</a><span>R$ 99,90</span></div>'
+        html = html.replace(b"</body>", block * args.pad + b"</body>")
+
+    adapter = MagaluAdapter()
+    repeat = max(1, args.repeat // (1 + args.pad // 100))
+    rows = [
+        ("BeautifulSoup", *measure(soup_parse, html, repeat)),
+        ("lxml/XPath", *measure(adapter.parse, html, repeat)),
+    ]
+    print(f"página: {len(html)} bytes, {repeat} repetições")
+    for name, per_call, peak in rows:
+        print(f"{name:>14}: {per_call * 1e6:9.1f} µs/página   pico {peak / 1024:8.1f} KiB")
+    print(f"{'speedup':>14}: {rows[0][1] / rows[1][1]:.1f}x   memória {rows[0][2] / max(rows[1][2], 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -48,14 +48,36 @@ document.addEventListener('DOMContentLoaded', function() {
       }
 
       const data = await res.json();
-      document.getElementById("status").innerText = `✅ Produto monitorado! ID: ${data.product_id}`;
+      document.getElementById("status").innerText = `✅ Produto monitorado! ID: ${data.product_id} — verificando preço...`;
       
       // Limpar campos após sucesso
       document.getElementById("target_price").value = "";
       document.getElementById("drop_percent").value = "";
+
+      // A 1ª checagem roda em segundo plano; acompanha pelo status do job
+      const job = await waitForJob(`${API_BASE}${data.status_url}`);
+      if (job && job.status === "done") {
+        const product = await (await fetch(`${API_BASE}/products/${data.product_id}`)).json();
+        const price = product.current_price ? `R$ ${product.current_price.toFixed(2)}` : "preço não encontrado";
+        document.getElementById("status").innerText = `✅ Produto monitorado! ID: ${data.product_id} — ${price}`;
+      } else if (job) {
+        document.getElementById("status").innerText = `✅ Produto monitorado! ID: ${data.product_id} (1ª checagem falhou: ${job.error}; será tentada de novo)`;
+      }
       
     } catch (err) {
       document.getElementById("status").innerText = `❌ Falha: ${err.message}`;
     }
   });
 });
+
+// Consulta o status do job a cada 1s até terminar (null se desistir)
+async function waitForJob(statusUrl, attempts = 30) {
+  for (let i = 0; i < attempts; i++) {
+    await new Promise(resolve => setTimeout(resolve, 1000));
+    const res = await fetch(statusUrl);
+    if (!res.ok) return null;
+    const job = await res.json();
+    if (job.status === "done" || job.status === "failed") return job;
+  }
+  return null;
+}
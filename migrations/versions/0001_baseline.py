@@ -0,0 +1,60 @@
+"""schema inicial (products, price_history, watches)
+
+Mesmo schema que o antigo Base.metadata.create_all gerava. Bancos criados
+assim são marcados nesta revisão por app.core.migrations.upgrade_db.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "products",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("url", sa.String(), nullable=False, unique=True),
+        sa.Column("domain", sa.String()),
+        sa.Column("title", sa.String()),
+        sa.Column("currency", sa.String()),
+        sa.Column("current_price", sa.Float()),
+        sa.Column("in_stock", sa.Boolean()),
+        sa.Column("last_checked_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_products_id", "products", ["id"])
+    op.create_index("ix_products_domain", "products", ["domain"])
+
+    op.create_table(
+        "price_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("captured_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_price_history_product_id", "price_history", ["product_id"])
+
+    op.create_table(
+        "watches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("channel", sa.String(), nullable=False),
+        sa.Column("target_price", sa.Float()),
+        sa.Column("drop_percent", sa.Float()),
+        sa.Column("endpoint", sa.String(), nullable=False),
+        sa.Column("active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_watches_product_id", "watches", ["product_id"])
+
+
+def downgrade():
+    op.drop_table("watches")
+    op.drop_table("price_history")
+    op.drop_table("products")
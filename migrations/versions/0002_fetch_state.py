@@ -0,0 +1,33 @@
+"""fetch_state (validadores HTTP e hash do conteúdo)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # bancos antigos podem já ter a tabela, criada pelo create_all
+    if sa.inspect(op.get_bind()).has_table("fetch_state"):
+        return
+    op.create_table(
+        "fetch_state",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("etag", sa.String()),
+        sa.Column("last_modified", sa.String()),
+        sa.Column("content_hash", sa.String(32)),
+        sa.Column("title", sa.String()),
+        sa.Column("price", sa.Float()),
+        sa.Column("in_stock", sa.Boolean()),
+    )
+
+
+def downgrade():
+    op.drop_table("fetch_state")
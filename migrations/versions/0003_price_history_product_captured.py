@@ -0,0 +1,32 @@
+"""índice composto (product_id, captured_at DESC) em price_history
+
+Histórico, página de histórico e o "preço anterior" dos triggers filtram
+por produto e ordenam por captured_at DESC. Com o índice composto o banco
+lê as linhas já na ordem certa, sem sort. Ele também cobre buscas só por
+product_id, então o índice simples antigo sai.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_price_history_product_captured",
+        "price_history",
+        ["product_id", sa.text("captured_at DESC")],
+    )
+    op.drop_index("ix_price_history_product_id", table_name="price_history")
+
+
+def downgrade():
+    op.create_index("ix_price_history_product_id", "price_history", ["product_id"])
+    op.drop_index("ix_price_history_product_captured", table_name="price_history")
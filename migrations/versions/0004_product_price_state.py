@@ -0,0 +1,54 @@
+"""preço anterior, menor preço e data da última mudança em products
+
+Evita consultar price_history a cada scrape só para achar o preço anterior.
+As colunas são preenchidas a partir do histórico existente.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("products") as batch:
+        batch.add_column(sa.Column("previous_price", sa.Float()))
+        batch.add_column(sa.Column("lowest_price", sa.Float()))
+        batch.add_column(sa.Column("price_changed_at", sa.DateTime(timezone=True)))
+
+    op.execute("""
+        UPDATE products SET
+            lowest_price = (SELECT MIN(ph.price) FROM price_history ph WHERE ph.product_id = products.id),
+            previous_price = (
+                SELECT ph.price FROM price_history ph
+                WHERE ph.product_id = products.id AND ph.price <> products.current_price
+                ORDER BY ph.captured_at DESC LIMIT 1
+            )
+    """)
+    # a mudança aconteceu na primeira captura depois do último preço diferente
+    # (ou na primeira captura de todas, se o preço nunca mudou)
+    op.execute("""
+        UPDATE products SET price_changed_at = (
+            SELECT MIN(ph.captured_at) FROM price_history ph
+            WHERE ph.product_id = products.id
+              AND NOT EXISTS (
+                  SELECT 1 FROM price_history old
+                  WHERE old.product_id = products.id
+                    AND old.price <> products.current_price
+                    AND old.captured_at >= ph.captured_at
+              )
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table("products") as batch:
+        batch.drop_column("price_changed_at")
+        batch.drop_column("lowest_price")
+        batch.drop_column("previous_price")
@@ -0,0 +1,28 @@
+"""last_seen_at em price_history (histórico em sequências)
+
+Com PRICE_HISTORY_MODE=runs um preço repetido só avança o last_seen_at da
+linha mais recente em vez de gravar outra. Linhas antigas ficam como pontos
+(last_seen_at nulo); `python -m app.core.migrations compact-history` junta
+as repetidas.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("price_history") as batch:
+        batch.add_column(sa.Column("last_seen_at", sa.DateTime(timezone=True)))
+
+
+def downgrade():
+    with op.batch_alter_table("price_history") as batch:
+        batch.drop_column("last_seen_at")
@@ -0,0 +1,74 @@
+"""agregados de preço por hora e por dia
+
+Gráficos de períodos longos leem price_rollup_hour/price_rollup_day em vez
+de todas as linhas de price_history. As tabelas são preenchidas aqui a
+partir do histórico existente e depois mantidas a cada gravação de preço.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+TABLES = {
+    "price_rollup_hour": lambda at: at.replace(minute=0, second=0, microsecond=0),
+    "price_rollup_day": lambda at: at.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+
+
+def _columns():
+    return [
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("bucket", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("min_price", sa.Float(), nullable=False),
+        sa.Column("max_price", sa.Float(), nullable=False),
+        sa.Column("sum_price", sa.Float(), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("last_price", sa.Float(), nullable=False),
+        sa.Column("last_at", sa.DateTime(timezone=True), nullable=False),
+    ]
+
+
+def _backfill(table, truncate):
+    history = sa.table(
+        "price_history",
+        sa.column("product_id", sa.Integer()),
+        sa.column("price", sa.Float()),
+        sa.column("captured_at", sa.DateTime()),
+        sa.column("last_seen_at", sa.DateTime()),
+    )
+    rows = {}
+    result = op.get_bind().execute(
+        sa.select(history).where(history.c.captured_at.isnot(None))
+        .order_by(history.c.product_id, history.c.captured_at)
+    )
+    for product_id, price, captured_at, last_seen_at in result:
+        # uma sequência conta pela primeira e pela última checagem
+        for at in filter(None, (captured_at, last_seen_at)):
+            key = (product_id, truncate(at))
+            r = rows.setdefault(key, {"product_id": product_id, "bucket": key[1], "min_price": price,
+                                      "max_price": price, "sum_price": 0.0, "samples": 0})
+            r["min_price"] = min(r["min_price"], price)
+            r["max_price"] = max(r["max_price"], price)
+            r["sum_price"] += price
+            r["samples"] += 1
+            r["last_price"], r["last_at"] = price, at
+    if rows:
+        op.bulk_insert(table, list(rows.values()))
+
+
+def upgrade():
+    for name, truncate in TABLES.items():
+        table = op.create_table(name, *_columns())
+        _backfill(table, truncate)
+
+
+def downgrade():
+    for name in TABLES:
+        op.drop_table(name)
@@ -0,0 +1,57 @@
+"""products.updated_at + índice (updated_at, id)
+
+GET /products pagina por keyset em (updated_at, id) e aceita `since=` para
+listar só o que mudou. A coluna é preenchida com a última mudança de preço
+(ou a última checagem) e regravada pelo SQLAlchemy, para todos os valores
+terem o mesmo formato (no SQLite a comparação do keyset é entre textos).
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("products") as batch:
+        batch.add_column(sa.Column("updated_at", sa.DateTime(timezone=True)))
+
+    products = sa.table(
+        "products",
+        sa.column("id", sa.Integer()),
+        sa.column("price_changed_at", sa.DateTime()),
+        sa.column("last_checked_at", sa.DateTime()),
+        sa.column("updated_at", sa.DateTime()),
+    )
+    conn = op.get_bind()
+    now = datetime.utcnow()
+    rows = [
+        {"b_id": pid, "b_updated_at": changed or checked or now}
+        for pid, changed, checked in conn.execute(
+            sa.select(products.c.id, products.c.price_changed_at, products.c.last_checked_at)
+        )
+    ]
+    if rows:
+        conn.execute(
+            products.update().where(products.c.id == sa.bindparam("b_id"))
+            .values(updated_at=sa.bindparam("b_updated_at", type_=sa.DateTime())),
+            rows,
+        )
+
+    with op.batch_alter_table("products") as batch:
+        batch.alter_column("updated_at", existing_type=sa.DateTime(timezone=True), nullable=False)
+    op.create_index("ix_products_updated", "products", ["updated_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_products_updated", table_name="products")
+    with op.batch_alter_table("products") as batch:
+        batch.drop_column("updated_at")
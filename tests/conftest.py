@@ -0,0 +1,90 @@
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# banco descartável: precisa estar definido antes de importar app.core.db
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+os.environ.setdefault("PARSE_WORKERS", "0")
+
+from app.core.db import SessionLocal  # noqa: E402
+from app.core.migrations import upgrade_db  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    upgrade_db()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+class Shop(ThreadingHTTPServer):
+    """Loja falsa: `routes[path] = (status, atraso em s)`; 200 devolve a página
+    de exemplo da Magalu. `times[path]` guarda quando cada acesso chegou e
+    `peak`, o máximo de requisições simultâneas."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ShopHandler)
+        self.routes = {}
+        self.hits = {}
+        self.times = {}
+        self.retry_after = "1"  # None = 429 sem Retry-After
+        self.active = 0  # requisições em andamento
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def url(self, path: str, host: str = "127.0.0.1") -> str:
+        # "localhost" e "127.0.0.1" são domínios diferentes para o scraper
+        return f"http://{host}:{self.server_address[1]}{path}"
+
+
+class _ShopHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, delay = self.server.routes.get(self.path, (200, 0.0))
+        self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+        self.server.times.setdefault(self.path, []).append(time.monotonic())
+        with self.server.lock:
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+        time.sleep(delay)
+        # sai da contagem antes de responder: o cliente só manda a próxima depois
+        with self.server.lock:
+            self.server.active -= 1
+        self.send_response(status)
+        if status == 200:
+            body = (FIXTURES / "sample_magalu.html").read_bytes()
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            if status == 429 and self.server.retry_after is not None:
+                self.send_header("Retry-After", self.server.retry_after)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def shop():
+    server = Shop()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
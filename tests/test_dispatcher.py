@@ -0,0 +1,57 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.models.notification import Notification
+from app.models.product import Product
+from app.models.watch import Watch
+from app.notifier import dispatcher, email
+from app.notifier.dispatcher import OutboxDispatcher
+
+
+def test_email_escapes_page_values(monkeypatch):
+    sent = []
+    monkeypatch.setattr(email, "send_email", lambda to, subject, body: sent.append(body))
+
+    dispatcher._send_email("a@b.c", {
+        "title": "<script>alert(1)</script>",
+        "price": 10.0,
+        "reason": "caiu <b>",
+        "url": 'https://loja/p?a=1&b="x"',
+    })
+
+    body = sent[0]
+    assert "<script>" not in body and "&lt;script&gt;" in body
+    assert "caiu &lt;b&gt;" in body
+    assert 'href="https://loja/p?a=1&amp;b=&quot;x&quot;"' in body
+
+
+def test_claim_skips_rows_settled_after_select(db, monkeypatch):
+    """Entre o SELECT e o UPDATE outro dispatcher pode ter enviado (e soltado)
+    a linha: ela não pode ser reservada de novo."""
+    product = Product(url="http://127.0.0.1/p/claim", domain="127.0.0.1")
+    db.add(product)
+    db.flush()
+    watch = Watch(product_id=product.id, channel="claimtest", endpoint="a@b.c", target_price=1.0, active=True)
+    db.add(watch)
+    db.flush()
+    row = Notification(watch_id=watch.id, product_id=product.id, channel="claimtest", endpoint="a@b.c",
+                       payload=json.dumps({"price": 1.0}), next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+    db.add(row)
+    db.commit()
+
+    execute = db.execute
+
+    def racing_execute(stmt, *args, **kwargs):
+        if getattr(stmt, "is_update", False):
+            # o outro dispatcher termina o envio antes do nosso UPDATE
+            execute(update(Notification).where(Notification.id == row.id).values(status="sent"))
+        return execute(stmt, *args, **kwargs)
+
+    monkeypatch.setattr(db, "execute", racing_execute)
+    d = OutboxDispatcher("claimtest", sender=lambda endpoint, payload: None)
+    try:
+        assert d.claim(db, 10) == []
+    finally:
+        d.close()
@@ -0,0 +1,125 @@
+import smtplib
+import socketserver
+import threading
+
+import pytest
+
+from app.core.settings import settings
+from app.notifier.email import SMTPPool
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo no lugar do aiosmtpd: guarda conexões, comandos
+    e mensagens. `drop_after` derruba a sessão depois de N mensagens."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, starttls: bool = False, drop_after: int = 0):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.starttls = starttls
+        self.drop_after = drop_after
+        self.connections = 0
+        self.commands = []
+        self.messages = []
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        sent = 0
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline().decode().rstrip("\r\n")
+            if not line:
+                return
+            verb = line.split(" ", 1)[0].upper()
+            server.commands.append(verb)
+            if verb == "EHLO":
+                self.reply("250-stand-in")
+                if server.starttls:
+                    self.reply("250-STARTTLS")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "DATA":
+                self.reply("354 fim com <CRLF>.<CRLF>")
+                body = []
+                while (data := self.rfile.readline().decode()) not in (".\r\n", ""):
+                    body.append(data)
+                server.messages.append("".join(body))
+                sent += 1
+                self.reply("250 OK")
+                if server.drop_after and sent >= server.drop_after:
+                    return
+            elif verb == "QUIT":
+                self.reply("221 tchau")
+                return
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP", "AUTH"):
+                self.reply("250 OK")
+            else:
+                self.reply("502 não implementado")
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    servers = []
+
+    def start(**kwargs) -> SMTPStandIn:
+        server = SMTPStandIn(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+        monkeypatch.setattr(settings, "SMTP_PORT", server.server_address[1])
+        monkeypatch.setattr(settings, "SMTP_TIMEOUT", 5.0)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pool_reuses_connections(smtp, monkeypatch):
+    server = smtp()
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+    pool = SMTPPool(size=1)
+    try:
+        for i in range(5):
+            pool.send("a@b.c", ["d@e.f"], f"Subject: {i}\r\n\r\noi")
+    finally:
+        pool.close()
+
+    assert len(server.messages) == 5
+    assert server.connections == pool.connects == 1
+
+
+def test_pool_reconnects_when_session_drops(smtp, monkeypatch):
+    server = smtp(drop_after=1)
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+    pool = SMTPPool(size=1)
+    try:
+        for i in range(3):
+            pool.send("a@b.c", ["d@e.f"], f"Subject: {i}\r\n\r\noi")
+    finally:
+        pool.close()
+
+    assert len(server.messages) == 3
+    assert pool.stats()["failed"] == 0
+
+
+def test_missing_starttls_never_sends_password(smtp, monkeypatch):
+    """STARTTLS ligado e não anunciado (downgrade): falha antes do login."""
+    server = smtp(starttls=False)
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", True)
+    monkeypatch.setattr(settings, "SMTP_USER", "user")
+    monkeypatch.setattr(settings, "SMTP_PASS", "segredo")
+    pool = SMTPPool(size=1)
+
+    with pytest.raises(smtplib.SMTPNotSupportedError):
+        pool.send("a@b.c", ["d@e.f"], "Subject: x\r\n\r\noi")
+
+    assert "AUTH" not in server.commands
+    assert server.messages == []
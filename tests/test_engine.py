@@ -0,0 +1,160 @@
+import asyncio
+import time
+from collections import defaultdict
+
+import pytest
+
+from app.core.db import SessionLocal
+from app.core.settings import settings
+from app.models.product import Product
+from app.scraper import http
+from app.scraper.engine import ScrapeEngine
+from app.scraper.persist import BatchWriter
+
+
+def add_products(db, shop, prefix: str, count: int, host: str = "127.0.0.1"):
+    products = [Product(url=shop.url(f"/{prefix}/{i}", host), domain=host) for i in range(count)]
+    db.add_all(products)
+    db.commit()
+    return products
+
+
+def test_throttled_domain_does_not_hold_global_slots(db, shop, monkeypatch):
+    """Um domínio em backoff (429) não pode segurar as vagas globais enquanto
+    espera: o domínio saudável termina sem esperar por ele."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKOFF_BASE", 0.5)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKOFF_MAX", 0.5)
+    monkeypatch.setattr(settings, "RATE_LIMIT_MAX_RETRIES", 0)
+    monkeypatch.setattr(http.limiter, "default_rate", 1000.0)
+    shop.retry_after = None
+    throttled = add_products(db, shop, "slow", 8, host="localhost")
+    healthy = add_products(db, shop, "ok", 8)
+    for p in throttled:
+        shop.routes[f"/slow/{p.url.rsplit('/', 1)[1]}"] = (429, 0.0)
+
+    started = time.monotonic()
+    stats = http.run_sync(ScrapeEngine(concurrency=2, per_domain=1).run(db, throttled + healthy))
+
+    assert stats.failed >= len(throttled)
+    last_healthy = max(t for path, times in shop.times.items() if path.startswith("/ok/") for t in times)
+    assert sum(1 for path in shop.times if path.startswith("/ok/")) == len(healthy)
+    assert last_healthy - started < 1.5
+
+
+def test_persist_errors_do_not_hang_the_cycle(db, shop, monkeypatch):
+    """Gravação falhando em todo lote: o ciclo termina e conta as falhas."""
+    monkeypatch.setattr(settings, "PIPELINE_QUEUE_SIZE", 2)
+    monkeypatch.setattr(settings, "PERSIST_BATCH_SIZE", 1)
+    monkeypatch.setattr(http.limiter, "default_rate", 1000.0)
+
+    def broken_flush(self):
+        self._units.clear()
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(BatchWriter, "flush", broken_flush)
+    products = add_products(db, shop, "broken", 30)
+
+    stats = http.run_sync(asyncio.wait_for(ScrapeEngine(concurrency=4).run(db, products), 20))
+
+    assert stats.failed == len(products)
+
+
+def test_failing_stage_cancels_the_others(db, shop, monkeypatch):
+    async def dead_persist_stage(self, db, persist_q, stats):
+        raise RuntimeError("gravação caiu")
+
+    monkeypatch.setattr(settings, "PIPELINE_QUEUE_SIZE", 2)
+    monkeypatch.setattr(http.limiter, "default_rate", 1000.0)
+    monkeypatch.setattr(ScrapeEngine, "_persist_stage", dead_persist_stage)
+    products = add_products(db, shop, "dead", 20)
+
+    with pytest.raises(RuntimeError, match="gravação caiu"):
+        http.run_sync(asyncio.wait_for(ScrapeEngine(concurrency=4).run(db, products), 20))
+
+
+def test_results_are_reported_after_commit(db, shop, monkeypatch):
+    """`on_result` só vê produtos já gravados: outra Session enxerga o preço."""
+    monkeypatch.setattr(http.limiter, "default_rate", 1000.0)
+    products = add_products(db, shop, "report", 5)
+    seen = []
+
+    def on_result(item):
+        with SessionLocal() as other:
+            seen.append((item["status"], other.get(Product, item["product_id"]).current_price))
+
+    stats = http.run_sync(ScrapeEngine(concurrency=4).run(db, products, on_result=on_result))
+
+    assert len(seen) == len(products)
+    assert all(status == "updated" and price is not None for status, price in seen)
+    assert stats.updated == len(products)
+
+
+def test_failed_batch_is_reported_as_failed(db, shop, monkeypatch):
+    monkeypatch.setattr(http.limiter, "default_rate", 1000.0)
+
+    def broken_write(self, units):
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(BatchWriter, "_write", broken_write)
+    products = add_products(db, shop, "lost", 5)
+    seen = []
+
+    stats = http.run_sync(ScrapeEngine(concurrency=4).run(db, products, on_result=seen.append))
+
+    assert [item["status"] for item in seen] == ["failed"] * len(products)
+    assert (stats.updated, stats.failed) == (0, len(products))
+
+
+@pytest.fixture
+def one_per_domain(monkeypatch):
+    monkeypatch.setattr(http.fetch_limits, "per_domain", 1)
+    http.fetch_limits.reset()
+    yield
+    http.fetch_limits.reset()
+
+
+def test_concurrent_runs_share_the_domain_limit(db, shop, monkeypatch, one_per_domain):
+    """Bulks simultâneos (e a fila do /track) dividem as vagas do processo:
+    juntos não passam de SCRAPE_PER_DOMAIN no domínio."""
+    monkeypatch.setattr(http.limiter, "default_rate", 1000.0)
+    products = add_products(db, shop, "shared", 8)
+    for p in products:
+        shop.routes[p.url.split(str(shop.server_address[1]), 1)[1]] = (200, 0.05)
+    first, second = SessionLocal(), SessionLocal()
+
+    async def both():
+        return await asyncio.gather(
+            ScrapeEngine().run(first, first.query(Product).filter(Product.id.in_([p.id for p in products[:4]])).all()),
+            ScrapeEngine().run(second, second.query(Product).filter(Product.id.in_([p.id for p in products[4:]])).all()),
+            http.fetch_limited(products[0].url),
+        )
+
+    try:
+        stats = http.run_sync(both())[:2]
+    finally:
+        first.close()
+        second.close()
+
+    assert sum(s.updated for s in stats) == len(products)
+    assert shop.peak == 1
+
+
+def test_waiting_for_a_host_does_not_hold_a_global_slot(shop, monkeypatch):
+    """Com o host lotado, a requisição espera sem vaga global: outro host passa."""
+    monkeypatch.setattr(settings, "HTTP_MAX_PER_HOST", 1)
+    monkeypatch.setattr(http, "_host_slots", defaultdict(lambda: asyncio.Semaphore(settings.HTTP_MAX_PER_HOST)))
+    monkeypatch.setattr(http.limiter, "default_rate", 1000.0)
+    shop.routes["/host/slow"] = (200, 0.5)
+
+    async def scenario():
+        global_slots = asyncio.Semaphore(2)
+        busy = [asyncio.create_task(http.fetch(shop.url("/host/slow", "localhost"), slot=global_slots))
+                for _ in range(2)]
+        await asyncio.sleep(0.1)
+        started = time.monotonic()
+        await http.fetch(shop.url("/host/other"), slot=global_slots)
+        elapsed = time.monotonic() - started
+        await asyncio.gather(*busy)
+        return elapsed
+
+    assert http.run_sync(scenario()) < 0.3
@@ -0,0 +1,24 @@
+import pytest
+
+from app.scraper.parsing import page_encoding, parse_page
+
+PAGE = """<html><head>{meta}<title>Ação Promoção — Café</title></head>
+<body><h1 data-testid="heading-product-title">Ação Promoção — Café</h1>
+<div data-testid="price-value">R$ 1.299,90</div></body></html>"""
+
+
+@pytest.mark.parametrize("charset", ["windows-1252", "iso-8859-1", "utf-8"])
+@pytest.mark.parametrize("declared", [True, False])
+def test_page_charset_is_respected(charset, declared):
+    """Título sai certo com o charset do Content-Type ou do <meta>."""
+    meta = f'<meta charset="{charset}">' if not declared else ""
+    body = PAGE.format(meta=meta).replace("—", "-" if charset != "utf-8" else "—").encode(charset)
+    _, result = parse_page("magazineluiza.com.br", body, charset if declared else None)
+    assert result.title.startswith("Ação Promoção")
+    assert result.price == 1299.90
+
+
+def test_page_encoding_defaults_to_utf8():
+    assert page_encoding(b"<html></html>") == "utf-8"
+    assert page_encoding(b'<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1">') == "iso8859-1"
+    assert page_encoding(b"<html></html>", "bogus-charset") == "utf-8"
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from app.core.cache import response_cache
+from app.models.price_history import PriceHistory
+from app.models.product import Product
+from app.scraper.adapters.base import ScrapeResult
+from app.scraper.persist import BatchWriter, ProductSnapshot
+
+
+def test_same_price_invalidates_history_cache(db):
+    """Preço igual só estende a sequência e os agregados, mas o histórico em
+    cache muda do mesmo jeito."""
+    seen = datetime.utcnow() - timedelta(hours=1)
+    product = Product(url="http://127.0.0.1/p/cache", domain="127.0.0.1", title="Produto", current_price=50.0)
+    db.add(product)
+    db.flush()
+    db.add(PriceHistory(product_id=product.id, price=50.0, captured_at=seen, last_seen_at=seen))
+    db.commit()
+    before, _ = response_cache.lookup("history", product.id, "30:0:raw")
+
+    writer = BatchWriter(db)
+    writer.add_result(ProductSnapshot.of(product), ScrapeResult(title="Produto", price=50.0, in_stock=True))
+    writer.flush()
+
+    after, _ = response_cache.lookup("history", product.id, "30:0:raw")
+    assert after != before
+
+
+def test_stock_change_without_price_invalidates_product_cache(db):
+    """Página de produto esgotado costuma vir sem preço: o estoque muda no
+    banco e GET /products/{id} não pode continuar servindo o antigo."""
+    product = Product(url="http://127.0.0.1/p/esgotado", domain="127.0.0.1", title="Produto",
+                      current_price=50.0, in_stock=True)
+    db.add(product)
+    db.commit()
+    before, _ = response_cache.lookup("product", product.id)
+
+    writer = BatchWriter(db)
+    writer.add_result(ProductSnapshot.of(product), ScrapeResult(title=None, price=None, in_stock=False))
+    writer.flush()
+
+    after, _ = response_cache.lookup("product", product.id)
+    assert after != before
+    db.expire_all()
+    assert db.get(Product, product.id).in_stock is False
+
+
+def test_updated_at_is_stamped_when_the_batch_is_written(db):
+    """`updated_at` é a hora da gravação, não a da checagem (que pode ser um
+    lote inteiro mais antiga)."""
+    product = Product(url="http://127.0.0.1/p/stamp", domain="127.0.0.1", current_price=50.0)
+    db.add(product)
+    db.commit()
+    writer = BatchWriter(db)
+    writer.add_result(ProductSnapshot.of(product), ScrapeResult(title=None, price=40.0, in_stock=True))
+    before_flush = datetime.utcnow()
+    writer.flush()
+
+    db.expire_all()
+    assert db.get(Product, product.id).updated_at >= before_flush
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.product import Product
+
+# bem no futuro: os produtos destes testes são os mais recentes do banco
+BASE = datetime(2100, 1, 1)
+
+
+@pytest.fixture
+def client():
+    # sem `with`: não sobe o startup (painel, pools)
+    return TestClient(app)
+
+
+def add(db, name: str, updated_at: datetime) -> Product:
+    product = Product(url=f"http://127.0.0.1/p/{name}", domain="127.0.0.1", updated_at=updated_at)
+    db.add(product)
+    db.commit()
+    return product
+
+
+def walk(client, **params):
+    ids, cursor = [], None
+    while True:
+        resp = client.get("/products", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200
+        ids += [p["id"] for p in resp.json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None or len(ids) > 1000:
+            return ids
+
+
+def test_keyset_pages_cover_every_product_once(db, client):
+    # empates em updated_at: o id desempata
+    products = [add(db, f"page-{i}", BASE + timedelta(seconds=i // 3)) for i in range(8)]
+    ours = {p.id for p in products}
+
+    newest_first = [pid for pid in walk(client, limit=3) if pid in ours]
+    since = [pid for pid in walk(client, limit=3, since=(BASE - timedelta(hours=1)).isoformat()) if pid in ours]
+
+    expected = [p.id for p in sorted(products, key=lambda p: (p.updated_at, p.id))]
+    assert since == expected
+    assert newest_first == expected[::-1]
+
+
+def test_since_repeats_the_overlap_window(db, client):
+    """Um lote carimbado antes, mas confirmado depois, do maior `updated_at`
+    que o cliente viu ainda aparece no próximo `since`."""
+    seen = add(db, "seen", BASE + timedelta(days=1))
+    late = add(db, "late", BASE + timedelta(days=1) - timedelta(seconds=10))
+
+    ids = [p["id"] for p in client.get("/products", params={"since": seen.updated_at.isoformat()}).json()]
+
+    assert late.id in ids
@@ -0,0 +1,40 @@
+import time
+
+from app.models.product import Product
+from app.scraper.queue import ScrapeQueue
+
+
+def wait_finished(queue: ScrapeQueue, job_id: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not queue.get(job_id).finished and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return queue.get(job_id)
+
+
+def test_unreachable_product_fails_the_job(db, shop):
+    """Erro no fetch chega ao status do job (não vira "done" sem preço)."""
+    shop.routes["/p/gone"] = (404, 0.0)
+    product = Product(url=shop.url("/p/gone"), domain="127.0.0.1")
+    db.add(product)
+    db.commit()
+    queue = ScrapeQueue(workers=1)
+    try:
+        job = wait_finished(queue, queue.submit(product.id).id)
+    finally:
+        queue.close()
+
+    assert job.status == "failed"
+    assert "404" in job.error
+
+
+def test_reachable_product_is_done(db, shop):
+    product = Product(url=shop.url("/p/ok"), domain="127.0.0.1")
+    db.add(product)
+    db.commit()
+    queue = ScrapeQueue(workers=1)
+    try:
+        job = wait_finished(queue, queue.submit(product.id).id)
+    finally:
+        queue.close()
+
+    assert (job.status, job.error, job.updated) == ("done", None, True)
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from app.models.fetch_state import FetchState
+from app.models.notification import Notification
+from app.models.price_history import PriceHistory
+from app.models.product import Product
+from app.models.watch import Watch
+from app.core.settings import settings
+from app.scraper.persist import BatchWriter
+from app.scraper.runner import scrape_once
+from app.scraper.watch_index import watch_index
+
+
+def test_not_modified_reuses_stored_result(db, shop):
+    """304 passa pelo mesmo caminho de um hash igual: dispara watches e
+    estende a sequência do histórico."""
+    shop.routes["/p/304"] = (304, 0.0)
+    seen = datetime.utcnow() - timedelta(hours=1)
+    product = Product(url=shop.url("/p/304"), domain="127.0.0.1", title="Produto", current_price=50.0)
+    db.add(product)
+    db.flush()
+    db.add_all([
+        FetchState(product_id=product.id, etag='"v1"', content_hash="x", title="Produto", price=50.0, in_stock=True),
+        PriceHistory(product_id=product.id, price=50.0, captured_at=seen, last_seen_at=seen),
+        Watch(product_id=product.id, channel="email", endpoint="a@b.c", target_price=60.0, active=True),
+    ])
+    db.commit()
+    watch_index.invalidate()
+
+    assert scrape_once(db, product) is True
+
+    db.expire_all()
+    assert db.query(Notification).filter(Notification.product_id == product.id).count() == 1
+    run = db.query(PriceHistory).filter(PriceHistory.product_id == product.id).one()
+    assert run.last_seen_at > seen
+
+
+def broken_write(self, units):
+    raise RuntimeError("banco fora")
+
+
+def test_failed_auto_flush_is_reported(db, shop, monkeypatch):
+    """add_result pode gravar o lote sozinho (tempo esgotado): a falha desse
+    flush também conta."""
+    monkeypatch.setattr(settings, "PERSIST_FLUSH_SECONDS", 0.0)
+    monkeypatch.setattr(BatchWriter, "_write", broken_write)
+    product = Product(url=shop.url("/p/flush"), domain="127.0.0.1")
+    db.add(product)
+    db.commit()
+
+    assert scrape_once(db, product) is False
+
+
+def test_flush_survives_failing_fallback(db, monkeypatch):
+    product = Product(url="http://127.0.0.1/p/fallback", domain="127.0.0.1")
+    db.add(product)
+    db.commit()
+    monkeypatch.setattr(BatchWriter, "_write", broken_write)
+
+    def broken_commit():
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(db, "commit", broken_commit)
+    writer = BatchWriter(db)
+    writer.add_checked(product.id)
+
+    assert writer.flush() == {product.id}
+    assert writer.failed == {product.id}
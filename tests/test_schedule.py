@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from app import worker
+from app.scraper import schedule
+from app.scraper.schedule import AdaptiveScheduler
+
+
+@pytest.fixture
+def adaptive():
+    s = AdaptiveScheduler()
+    s.min_interval, s.max_interval, s.default_interval = 1800, 86400, 10800
+    return s
+
+
+def test_interval_for(adaptive, monkeypatch):
+    monkeypatch.setattr(schedule.settings, "SCHEDULE_WATCHED_FACTOR", 0.5)
+    window = adaptive.window.total_seconds()
+
+    assert adaptive.interval_for(None, watched=False) == 10800
+    assert adaptive.interval_for(None, watched=True) == 5400
+    assert adaptive.interval_for(0, watched=False) == 86400
+    assert adaptive.interval_for(100, watched=False) == window / 100 / 2
+    # sempre entre min e max
+    assert adaptive.interval_for(10_000, watched=True) == 1800
+    assert adaptive.interval_for(1, watched=False) == 86400
+
+
+def test_pop_due(adaptive):
+    now = time.time()
+    adaptive._push(1, now - 30)
+    adaptive._push(2, now - 20)
+    adaptive._push(3, now - 10)
+    adaptive._push(4, now + 60)
+    adaptive._push(1, now + 120)  # reagendado: a entrada antiga fica obsoleta
+
+    assert adaptive.pop_due(limit=1, now=now) == [2]
+    assert adaptive.pop_due(limit=10, now=now) == [3]
+    assert adaptive.pop_due(limit=10, now=now + 90) == [4]
+    assert len(adaptive) == 1
+
+
+def test_reschedule(adaptive, db, monkeypatch):
+    monkeypatch.setattr(schedule, "count_price_changes", lambda db, ids, since: {pid: 0 for pid in ids})
+    before = time.time()
+
+    adaptive.reschedule(db, [7, 8])
+
+    assert set(adaptive._due) == {7, 8}
+    assert all(due >= before + adaptive.max_interval for due in adaptive._due.values())
+
+
+def test_reschedule_without_database(adaptive, db, monkeypatch):
+    def down(*args):
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(schedule, "count_price_changes", down)
+    before = time.time()
+
+    adaptive.reschedule(db, [7, 8])
+
+    assert set(adaptive._due) == {7, 8}
+    assert all(before + adaptive.min_interval <= due < before + adaptive.min_interval + 5
+               for due in adaptive._due.values())
+
+
+class DeadSession:
+    def query(self, *args):
+        raise RuntimeError("banco fora")
+
+    def close(self):
+        pass
+
+
+def test_worker_keeps_popped_ids_when_the_cycle_fails(adaptive, monkeypatch):
+    """Query dos produtos falhando: os ids que saíram do heap voltam para ele."""
+    adaptive.refresh = lambda db: None
+    adaptive._push(5, time.time() - 1)
+    adaptive._push(6, time.time() - 1)
+    monkeypatch.setattr(worker, "adaptive", adaptive)
+    monkeypatch.setattr(worker, "SessionLocal", DeadSession)
+
+    worker.job()
+
+    assert set(adaptive._due) == {5, 6}
@@ -0,0 +1,38 @@
+import pytest
+
+from app.models.notification import Notification
+from app.models.product import Product
+from app.models.watch import Watch
+from app.scraper.adapters.base import ScrapeResult
+from app.scraper.persist import BatchWriter, ProductSnapshot
+from app.scraper.watch_index import watch_index
+
+
+def notified(db, name: str, prices, **watch) -> int:
+    """Grava uma checagem por preço (um lote cada) e conta as notificações."""
+    product = Product(url=f"http://127.0.0.1/p/{name}", domain="127.0.0.1", current_price=100.0)
+    db.add(product)
+    db.flush()
+    db.add(Watch(product_id=product.id, channel="email", endpoint="a@b.c", active=True, **watch))
+    db.commit()
+    watch_index.invalidate()
+    snapshot = ProductSnapshot.of(product)
+    for price in prices:
+        writer = BatchWriter(db)
+        writer.add_result(snapshot, ScrapeResult(title=None, price=price, in_stock=True))
+        writer.flush()
+    return db.query(Notification).filter(Notification.product_id == product.id).count()
+
+
+@pytest.mark.parametrize("name, prices, watch, expected", [
+    # queda nova depois de uma alta: notifica de novo
+    ("drop-again", [45.0, 80.0, 50.0], {"drop_percent": 10.0}, 2),
+    # voltou acima do alvo e cruzou de novo: notifica de novo
+    ("target-again", [50.0, 70.0, 55.0], {"target_price": 60.0}, 2),
+    # abaixo do alvo o tempo todo, sem cair mais: só o primeiro
+    ("target-held", [50.0, 50.0, 55.0], {"target_price": 60.0}, 1),
+    # abaixo do alvo e caindo: cada queda nova notifica
+    ("target-lower", [50.0, 40.0], {"target_price": 60.0}, 2),
+])
+def test_debounce_only_holds_a_continuous_condition(db, name, prices, watch, expected):
+    assert notified(db, name, prices, **watch) == expected